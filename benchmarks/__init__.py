@@ -0,0 +1,9 @@
+"""Benchmarks for namedspace classes.
+
+Each module can be run on its own, for example:
+
+    python -m benchmarks.memory
+
+benchmarks.suite times all of the main operations and emits the results
+as JSON, so that runs can be compared to catch regressions.
+"""
@@ -0,0 +1,77 @@
+"""Reports how long it takes to construct namedspace instances.
+
+Each namedspace class gets an __init__ generated for the configuration
+of its fields. For comparison, each class is also timed with a
+subclass whose __init__ walks every field generically, looking up each
+value with _get_value, the way that __init__ worked before it was
+generated per configuration.
+"""
+import timeit
+
+from collections import OrderedDict
+
+from namedspace import namedspace
+
+
+NUMBER = 20000
+REPEAT = 3
+STORAGE_CHOICES = ("dict", "slots")
+
+# Keyword arguments for namedspace() and for the constructor
+CONFIGURATIONS = (
+    ("required", dict(required_fields=("a", "b", "c", "d", "e", "f")),
+        dict(a=1, b=2, c=3, d=4, e=5, f=6)),
+    ("optional", dict(required_fields=("a", "b", "c"), optional_fields=("d", "e", "f")),
+        dict(a=1, b=2, c=3)),
+    ("defaults", dict(required_fields=("a", "b", "c"), optional_fields=("d", "e", "f"),
+        default_values=dict(d=4, e=5, f=6)), dict(a=1, b=2, c=3)),
+    ("factories", dict(required_fields=("a", "b", "c"), optional_fields=("d", "e", "f"),
+        default_value_factories=dict(d=lambda ns: 4, e=lambda ns: 5, f=lambda ns: ns.a)), dict(a=1, b=2, c=3)),
+    )
+
+
+def generic_init(self, **kwargs):
+    "Store the field values the generic way, checking every field through _get_value."
+    if self._storage == "dict":
+        self._field_value_storage = OrderedDict()
+
+    for field_name, field_value in kwargs.iteritems():
+        if field_name in self._all_fields_set:
+            self._write_storage(field_name, field_value)
+        else:
+            raise ValueError("field '{field_name} does not exist.".format(field_name=field_name))
+
+    for field_name in self._field_names:
+        if field_name in self._lazy_fields and self._read_storage(field_name) is None:
+            continue
+
+        try:
+            field_value = self._get_value(field_name)
+        except self.FieldNameError:
+            field_value = None
+
+        if field_value in (None, "") and field_name in self._required_fields_set:
+            raise ValueError("A value for field '{field_name}' is required.".format(field_name=field_name))
+        elif not field_name in kwargs:
+            self._write_storage(field_name, field_value)
+
+
+def microseconds_per_instance(cls, kwargs):
+    return min(timeit.repeat(lambda: cls(**kwargs), number=NUMBER, repeat=REPEAT)) * 1e6 / NUMBER
+
+
+def main():
+    print "{:>10} {:>8} {:>12} {:>12} {:>8}".format("fields", "storage", "generic us", "generated us", "speedup")
+    for name, namedspace_kwargs, kwargs in CONFIGURATIONS:
+        for storage in STORAGE_CHOICES:
+            cls = namedspace("ConstructionNS", storage=storage, **namedspace_kwargs)
+            generic_cls = type("GenericConstructionNS", (cls,), dict(__init__=generic_init, __slots__=()))
+
+            generic_time = microseconds_per_instance(generic_cls, kwargs)
+            generated_time = microseconds_per_instance(cls, kwargs)
+            print "{:>10} {:>8} {:>12.2f} {:>12.2f} {:>7.1f}x".format(name, storage, generic_time, generated_time,
+                    generic_time / generated_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Reports the memory used per instance by each namedspace configuration.
+
+Field values are shared between all instances, so only the memory
+owned by the instances themselves (the object, its __dict__ and its
+field value storage) is counted. The total for a batch of instances is
+divided by the batch size, so that attribute name strings shared by all
+instances do not distort the result.
+
+Each configuration is measured twice: by walking the objects that the
+instances reference with the gc module, and with _sizeof_many(). The
+two should agree; a difference means that one of them misses part of
+the storage of an instance.
+"""
+import gc
+import sys
+
+from namedspace import namedspace
+
+
+FIELD_COUNTS = (1, 4, 16)
+INSTANCE_COUNT = 1000
+STORAGE_CHOICES = ("dict", "slots")
+
+# Keyword arguments for namedspace(), given the field names
+CONFIGURATIONS = (
+    ("immutable", lambda field_names: dict()),
+    ("mutable", lambda field_names: dict(mutable_fields=field_names)),
+    ("defaults", lambda field_names: dict(default_values=dict.fromkeys(field_names, "default"))),
+    ("interned", lambda field_names: dict(intern=True)),
+    )
+
+
+def owned_size(objs, shared_ids):
+    "Return the size of objs and everything they reference that is not shared."
+    seen = set(shared_ids)
+    pending = list(objs)
+    total = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return total
+
+
+def bytes_per_instance(field_count, storage, namedspace_kwargs):
+    "Return the bytes per instance measured by walking the instances, and by _sizeof_many()."
+    field_names = tuple("field_{index}".format(index=index) for index in xrange(field_count))
+    field_values = tuple("value_{index}".format(index=index) for index in xrange(field_count))
+
+    cls = namedspace("MemoryNS", optional_fields=field_names, storage=storage, **namedspace_kwargs(field_names))
+    kwargs = dict(zip(field_names, field_values))
+    instances = [cls(**kwargs) for _ in xrange(INSTANCE_COUNT)]
+
+    shared_ids = set(id(obj) for obj in field_names + field_values + (None, True, False))
+    return (owned_size(instances, shared_ids) // INSTANCE_COUNT,
+            cls._sizeof_many(instances) // INSTANCE_COUNT)
+
+
+def main():
+    print "{:>8} {:>10} {:>8} {:>12} {:>12}".format("fields", "config", "storage", "walked bytes", "_sizeof bytes")
+    for field_count in FIELD_COUNTS:
+        for name, namedspace_kwargs in CONFIGURATIONS:
+            for storage in STORAGE_CHOICES:
+                print "{:>8} {:>10} {:>8} {:>12} {:>12}".format(field_count, name, storage,
+                        *bytes_per_instance(field_count, storage, namedspace_kwargs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compares pickle payload size and dumps/loads throughput of namedspace
+instances with equivalent namedtuples, dicts and the previous pickle format.
+
+The previous format pickled each instance through the default object
+machinery, which stored the instance __dict__ with its OrderedDict of
+field values. It is reproduced here by pickling the instance __dict__
+of each instance.
+"""
+import cPickle
+import timeit
+
+from collections import namedtuple
+
+from namedspace import namedspace
+
+
+REQUIRED_FIELDS = ("id", "name", "quantity", "price")
+OPTIONAL_FIELDS = ("note",)
+FIELD_NAMES = REQUIRED_FIELDS + OPTIONAL_FIELDS
+RECORD_COUNT = 10000
+REPEAT = 3
+
+# Classes must be importable by name to be pickled
+BenchNS = namedspace("BenchNS", REQUIRED_FIELDS, OPTIONAL_FIELDS)
+BenchSlotsNS = namedspace("BenchSlotsNS", REQUIRED_FIELDS, OPTIONAL_FIELDS, storage="slots")
+BenchTuple = namedtuple("BenchTuple", FIELD_NAMES)
+
+
+def make_records():
+    rows = [(index, "name {index}".format(index=index), index * 10, index * 1.5)
+            for index in xrange(RECORD_COUNT)]
+    dict_ns_records = BenchNS._make_many(rows)
+    return (
+        ("namedspace (previous format)", [record.__dict__ for record in dict_ns_records]),
+        ("namedspace (dict storage)", dict_ns_records),
+        ("namedspace (slots storage)", BenchSlotsNS._make_many(rows)),
+        ("namedtuple", [BenchTuple._make(row + (None,)) for row in rows]),
+        ("dict", [dict(zip(REQUIRED_FIELDS, row), note=None) for row in rows]),
+        )
+
+
+def measure(records):
+    payload = cPickle.dumps(records, cPickle.HIGHEST_PROTOCOL)
+    dumps_seconds = min(timeit.repeat(lambda: cPickle.dumps(records, cPickle.HIGHEST_PROTOCOL),
+            number=1, repeat=REPEAT))
+    loads_seconds = min(timeit.repeat(lambda: cPickle.loads(payload), number=1, repeat=REPEAT))
+    return (len(payload) / float(len(records)), len(records) / dumps_seconds, len(records) / loads_seconds)
+
+
+def main():
+    print "{:<30} {:>14} {:>14} {:>14}".format("format", "bytes/record", "dumps/second", "loads/second")
+    for name, records in make_records():
+        print "{:<30} {:>14.1f} {:>14.0f} {:>14.0f}".format(name, *measure(records))
+
+
+if __name__ == "__main__":
+    main()
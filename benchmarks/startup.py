@@ -0,0 +1,78 @@
+"""Reports how long it takes to define many namedspace classes, as a
+service does when its modules are imported.
+
+The classes are defined without the on-disk code cache, with an empty
+code cache that has to be filled, and with a code cache filled by an
+earlier run. The in-memory class cache is turned off, as it would be
+empty in a new process.
+"""
+import shutil
+import tempfile
+import timeit
+
+import namedspace as namedspace_package
+from namedspace import NamedspaceClassCache
+from namedspace import NamedspaceCodeCache
+from namedspace import namedspace
+
+
+CLASS_COUNT = 300
+REPEAT = 3
+
+# Keyword arguments for namedspace(), given the field names
+CONFIGURATIONS = (
+    lambda field_names: dict(required_fields=field_names),
+    lambda field_names: dict(required_fields=field_names[:2], optional_fields=field_names[2:],
+        default_values=dict.fromkeys(field_names[2:], 0)),
+    lambda field_names: dict(required_fields=field_names, mutable_fields=field_names[1:], storage="slots"),
+    lambda field_names: dict(required_fields=field_names, order=True, intern=True),
+    )
+
+
+def define_classes():
+    "Define CLASS_COUNT different namedspace classes."
+    for index in xrange(CLASS_COUNT):
+        field_names = tuple("field_{index}_{field_index}".format(index=index, field_index=field_index)
+                for field_index in xrange(4 + index % 8))
+        namedspace("StartupNS{index}".format(index=index),
+                **CONFIGURATIONS[index % len(CONFIGURATIONS)](field_names))
+
+
+def milliseconds(setup):
+    "Return the best time in milliseconds to define the classes, calling setup before each run."
+    times = []
+    for _ in xrange(REPEAT):
+        setup()
+        times.append(timeit.timeit(define_classes, number=1))
+    return min(times) * 1e3
+
+
+def main():
+    saved_class_cache = namedspace_package.namedspace_class_cache
+    saved_code_cache = namedspace_package.namedspace_code_cache
+    namedspace_package.namedspace_class_cache = NamedspaceClassCache(maxsize=0)
+    directory = tempfile.mkdtemp()
+    code_cache = NamedspaceCodeCache(directory)
+
+    def no_code_cache():
+        namedspace_package.namedspace_code_cache = None
+
+    def cold_code_cache():
+        code_cache.clear()
+        namedspace_package.namedspace_code_cache = code_cache
+
+    def warm_code_cache():
+        namedspace_package.namedspace_code_cache = code_cache
+
+    try:
+        print "{:>8} {:>12} {:>12}".format("classes", "code cache", "ms")
+        for name, setup in (("none", no_code_cache), ("cold", cold_code_cache), ("warm", warm_code_cache)):
+            print "{:>8} {:>12} {:>12.1f}".format(CLASS_COUNT, name, milliseconds(setup))
+    finally:
+        namedspace_package.namedspace_class_cache = saved_class_cache
+        namedspace_package.namedspace_code_cache = saved_code_cache
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
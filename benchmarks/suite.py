@@ -0,0 +1,198 @@
+"""Times the hot operations of namedspace classes and emits the results as JSON.
+
+Each operation is timed for namedspace classes with dict and slots
+storage, and where it makes sense for namedtuples, plain dicts and plain
+__slots__ classes with the same fields, for several field counts.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare results.json
+
+With --compare, the results of the current run are compared with an
+earlier run, and the exit status is non-zero if any operation got
+slower than the threshold allows.
+"""
+import argparse
+import cPickle
+import json
+import platform
+import sys
+import timeit
+
+from collections import namedtuple
+from itertools import count
+
+import namedspace as namedspace_package
+from namedspace import NamedspaceClassCache
+from namedspace import namedspace
+
+
+FIELD_COUNTS = (2, 8, 32)
+NUMBER = 10000
+REPEAT = 3
+THRESHOLD = 1.2
+
+_class_ids = count()
+
+
+def _register(cls):
+    "Make cls importable from this module, so that its instances can be pickled."
+    cls.__module__ = __name__
+    globals()[cls.__name__] = cls
+    return cls
+
+
+def _slots_class(typename, field_names):
+    "Return a plain class with __slots__ and an __init__ that takes the fields as keyword arguments."
+    class_definition = "class {typename}(object):\n    __slots__ = {field_names!r}\n" \
+        "    def __init__(self, {args}):\n{assignments}\n".format(typename=typename, field_names=field_names,
+        args=", ".join(field_names), assignments="\n".join("        self.{name} = {name}".format(name=name)
+            for name in field_names))
+    namespace = {}
+    exec class_definition in namespace
+    return namespace[typename]
+
+
+def _subjects(field_count):
+    "Return (kind, class, instance, equal instance) for each kind of record with field_count fields."
+    field_names = tuple("field_{index}".format(index=index) for index in xrange(field_count))
+    kwargs = dict((field_name, index) for index, field_name in enumerate(field_names))
+    subjects = []
+
+    for storage in ("dict", "slots"):
+        cls = _register(namedspace("BenchNS{id}".format(id=next(_class_ids)), field_names, storage=storage))
+        subjects.append(("namedspace_" + storage, cls, cls(**kwargs), cls(**kwargs)))
+
+    cls = _register(namedtuple("BenchTuple{id}".format(id=next(_class_ids)), field_names))
+    subjects.append(("namedtuple", cls, cls(**kwargs), cls(**kwargs)))
+
+    subjects.append(("dict", dict, dict(kwargs), dict(kwargs)))
+
+    cls = _register(_slots_class("BenchSlots{id}".format(id=next(_class_ids)), field_names))
+    subjects.append(("slots_class", cls, cls(**kwargs), cls(**kwargs)))
+
+    return field_names, kwargs, subjects
+
+
+def _operations(field_count):
+    "Yield (operation, kind, callable) for everything to time with field_count fields."
+    field_names, kwargs, subjects = _subjects(field_count)
+    first_field = field_names[0]
+    optional_fields = field_names[field_count // 2:]
+
+    uncached = NamedspaceClassCache(maxsize=0)
+
+    def create_namedspace_class(storage):
+        saved_cache = namedspace_package.namedspace_class_cache
+        namedspace_package.namedspace_class_cache = uncached
+        try:
+            return namedspace("BenchCreateNS", field_names, storage=storage)
+        finally:
+            namedspace_package.namedspace_class_cache = saved_cache
+
+    for storage in ("dict", "slots"):
+        yield "class_creation", "namedspace_" + storage, lambda storage=storage: create_namedspace_class(storage)
+    yield "class_creation", "namedtuple", lambda: namedtuple("BenchCreateTuple", field_names)
+    yield "class_creation", "slots_class", lambda: _slots_class("BenchCreateSlots", field_names)
+
+    for storage in ("dict", "slots"):
+        cls = namedspace("BenchDefaultsNS{id}".format(id=next(_class_ids)), field_names[:field_count // 2],
+            optional_fields, storage=storage,
+            default_values=dict((field_name, 0) for field_name in optional_fields[::2]),
+            default_value_factories=dict((field_name, lambda ns: 1) for field_name in optional_fields[1::2]))
+        required_kwargs = dict((field_name, kwargs[field_name]) for field_name in cls._required_fields_set)
+        yield "construction_defaults", "namedspace_" + storage, lambda cls=cls: cls(**required_kwargs)
+
+    for kind, cls, instance, other_instance in subjects:
+        pickled_instance = cPickle.dumps(instance, cPickle.HIGHEST_PROTOCOL)
+
+        yield "construction", kind, lambda cls=cls: cls(**kwargs)
+        yield "equality", kind, lambda instance=instance, other_instance=other_instance: instance == other_instance
+        yield "repr", kind, lambda instance=instance: repr(instance)
+        yield "pickle_dumps", kind, lambda instance=instance: cPickle.dumps(instance, cPickle.HIGHEST_PROTOCOL)
+        yield "pickle_loads", kind, lambda pickled_instance=pickled_instance: cPickle.loads(pickled_instance)
+
+        if kind == "dict":
+            yield "attribute_read", kind, lambda instance=instance: instance[first_field]
+        else:
+            yield "attribute_read", kind, lambda instance=instance: getattr(instance, first_field)
+
+        if kind in ("namedspace_dict", "namedspace_slots", "dict"):
+            yield "mapping_read", kind, lambda instance=instance: instance[first_field]
+
+        if kind in ("namedspace_dict", "namedspace_slots", "namedtuple"):
+            yield "hash", kind, lambda instance=instance: hash(instance)
+
+        if kind in ("namedspace_dict", "namedspace_slots"):
+            yield "as_dict", kind, lambda instance=instance: instance._as_dict
+        elif kind == "namedtuple":
+            yield "as_dict", kind, lambda instance=instance: instance._asdict()
+        elif kind == "dict":
+            yield "as_dict", kind, lambda instance=instance: dict(instance)
+
+
+def run(field_counts=FIELD_COUNTS, number=NUMBER, repeat=REPEAT):
+    "Return the benchmark results as a JSON-serializable dict."
+    results = []
+    for field_count in field_counts:
+        for operation, kind, function in _operations(field_count):
+            operation_number = max(number // 100, 1) if operation == "class_creation" else number
+            seconds = min(timeit.repeat(function, number=operation_number, repeat=repeat))
+            results.append(dict(
+                operation=operation,
+                kind=kind,
+                field_count=field_count,
+                microseconds_per_call=seconds * 1e6 / operation_number,
+                ))
+    return dict(
+        python_version=platform.python_version(),
+        python_implementation=platform.python_implementation(),
+        results=results,
+        )
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    "Return (key, baseline time, current time) for each result that is slower than threshold allows."
+    baseline_times = dict(((result["operation"], result["kind"], result["field_count"]),
+            result["microseconds_per_call"]) for result in baseline["results"])
+    regressions = []
+    for result in current["results"]:
+        key = (result["operation"], result["kind"], result["field_count"])
+        if key in baseline_times and result["microseconds_per_call"] > baseline_times[key] * threshold:
+            regressions.append((key, baseline_times[key], result["microseconds_per_call"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--field-counts", type=int, nargs="+", default=FIELD_COUNTS)
+    parser.add_argument("--number", type=int, default=NUMBER, help="calls per timing")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timings per operation, the best is kept")
+    parser.add_argument("--output", help="file to write the JSON results to, instead of stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+        help="slowdown ratio above which a comparison fails")
+    args = parser.parse_args(argv)
+
+    current = run(args.field_counts, args.number, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(current, output_file, indent=2, sort_keys=True)
+    else:
+        json.dump(current, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(json.load(baseline_file), current, args.threshold)
+        for (operation, kind, field_count), baseline_time, current_time in regressions:
+            sys.stderr.write("{operation} {kind} {field_count} fields: {baseline_time:.3f}us -> "
+                "{current_time:.3f}us\n".format(operation=operation, kind=kind, field_count=field_count,
+                baseline_time=baseline_time, current_time=current_time))
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
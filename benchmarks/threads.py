@@ -0,0 +1,86 @@
+"""Reports what the thread_safe option costs namedspace instances.
+
+Single-threaded, it times field writes, multi-field updates and
+consistent reads of thread-safe instances against plain mutable ones.
+It then runs reader threads that take snapshots while a writer thread
+keeps updating the same instance, and reports the snapshots and updates
+per second.
+"""
+import threading
+import time
+import timeit
+
+from namedspace import namedspace
+
+
+NUMBER = 20000
+REPEAT = 3
+CONTENTION_SECONDS = 1.0
+READER_COUNT = 3
+STORAGE_CHOICES = ("dict", "slots")
+FIELD_NAMES = ("host", "port", "timeout", "retries")
+
+
+def microseconds(function):
+    return min(timeit.repeat(function, number=NUMBER, repeat=REPEAT)) * 1e6 / NUMBER
+
+
+def contention(instance):
+    "Return the snapshots and the updates per second with readers and a writer sharing instance."
+    counts = dict(snapshots=0, updates=0)
+    stop = []
+
+    def read():
+        snapshots = 0
+        while not stop:
+            instance._snapshot()
+            snapshots += 1
+        counts["snapshots"] += snapshots
+
+    def write():
+        updates = 0
+        while not stop:
+            instance._update(port=updates, timeout=updates)
+            updates += 1
+        counts["updates"] += updates
+
+    threads = [threading.Thread(target=read) for _ in xrange(READER_COUNT)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    time.sleep(CONTENTION_SECONDS)
+    stop.append(True)
+    for thread in threads:
+        thread.join()
+    return counts["snapshots"] / CONTENTION_SECONDS, counts["updates"] / CONTENTION_SECONDS
+
+
+def main():
+    print "{:>8} {:>12} {:>10} {:>10}".format("storage", "operation", "plain us", "safe us")
+    for storage in STORAGE_CHOICES:
+        plain_cls = namedspace("PlainConfigNS", FIELD_NAMES, mutable_fields=FIELD_NAMES, storage=storage)
+        safe_cls = namedspace("SafeConfigNS", FIELD_NAMES, mutable_fields=FIELD_NAMES, storage=storage,
+            thread_safe=True)
+        plain = plain_cls(host="localhost", port=1, timeout=2, retries=3)
+        safe = safe_cls(host="localhost", port=1, timeout=2, retries=3)
+
+        def plain_update():
+            plain.port = 2
+            plain.timeout = 3
+
+        operations = (
+            ("set", lambda: setattr(plain, "port", 2), lambda: setattr(safe, "port", 2)),
+            ("update 2", plain_update, lambda: safe._update(port=2, timeout=3)),
+            ("read all", lambda: plain._field_values, lambda: safe._field_values),
+            ("snapshot", lambda: plain._field_values, lambda: safe._snapshot()),
+            )
+        for name, plain_function, safe_function in operations:
+            print "{:>8} {:>12} {:>10.2f} {:>10.2f}".format(storage, name, microseconds(plain_function),
+                    microseconds(safe_function))
+
+        snapshot_rate, update_rate = contention(safe)
+        print "{:>8} {:>12} {:>10.0f} snapshots/s, {:.0f} updates/s with {readers} readers".format(
+                storage, "contention", snapshot_rate, update_rate, readers=READER_COUNT)
+
+
+if __name__ == "__main__":
+    main()
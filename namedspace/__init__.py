@@ -1,18 +1,47 @@
 
+import csv as _csv
+import gc as _gc
+import json as _json
+import keyword as _keyword
+import marshal as _marshal
+import os as _os
+import re as _re
+import struct as _struct
+import tempfile as _tempfile
 import sys as _sys
+import thread as _thread
+import threading as _threading
+import weakref as _weakref
+
+from copy import deepcopy as _deepcopy
+from datetime import date as _date
+from datetime import datetime as _datetime
+from datetime import time as _time
+from datetime import timedelta as _timedelta
+from hashlib import sha1 as _sha1
+from timeit import default_timer as _default_timer
+from types import BuiltinFunctionType as _BuiltinFunctionType
+from types import FunctionType as _FunctionType
+from types import ModuleType as _ModuleType
+
+from copy_reg import __newobj__ as _newobj
 
 from collections import Container
 from collections import Hashable
 from collections import Mapping
 from collections import MutableMapping
 from collections import OrderedDict
+from collections import namedtuple
+from itertools import izip
 
 from frozendict import frozendict
 
 
 def namedspace(typename, required_fields=(), optional_fields=(), mutable_fields=(),
         default_values=frozendict(), default_value_factories=frozendict(),
-        return_none=False):
+        return_none=False, storage="dict", lazy_factories=False, order=False,
+        struct_formats=frozendict(), struct_byte_order="<", instrument=False,
+        intern=False, intern_maxsize=None, thread_safe=False, track_dirty_fields=False):
     """Builds a new class that encapsulates a namespace and provides
     various ways to access it.
 
@@ -39,6 +68,11 @@ def namedspace(typename, required_fields=(), optional_fields=(), mutable_fields=
     as mutable, all instances are not hashable and cannot be used as
     dictionary keys.
 
+    The hash of an immutable instance is computed the first time it is
+    needed and then cached on the instance. A subclass whose properties
+    override field values with results that can change over time
+    should set the _cache_hash class attribute to False.
+
     The default_values mapping provides simple default values for the
     fields.
 
@@ -50,6 +84,87 @@ def namedspace(typename, required_fields=(), optional_fields=(), mutable_fields=
     The default_values_factories mapping is only consulted if there
     is no default value for the field in the default_values mapping.
 
+    By default, the factories are called when an instance is created.
+    Factories that wait on I/O can wait concurrently for many instances
+    at once when the instances are built by the _make_concurrent class
+    method.
+
+    If the lazy_factories argument is True, each factory is instead
+    called the first time its field is read, and the value it returns
+    is then kept in the instance. A required field that gets its value
+    from a factory is only checked for a value when it is first read.
+
+    Instances are equal if they are instances of the same class and
+    have the same field values. If the order argument is True, the
+    generated class also supports ordering comparisons, which compare
+    field values in field order, the same way that tuples are compared.
+
+    The struct_formats mapping can give a struct module format for a
+    single value for every field. The generated class then has _pack
+    and _pack_into methods, which encode an instance as a fixed-width
+    binary record, and _unpack_from and _iter_unpack class methods,
+    which decode records from a buffer. The struct_byte_order argument
+    gives the byte order of the records, which are never padded.
+
+    The storage argument selects how field values are stored in each
+    instance. The default, "dict", keeps them in an OrderedDict. The
+    alternative, "slots", generates a class with one __slots__ entry
+    per field and no per-instance __dict__, which makes instances
+    considerably smaller. With "slots" storage, all field names must
+    be valid Python identifiers that do not start with a double
+    underscore.
+
+    If the instrument argument is True, the generated class counts the
+    instances created, the calls to each default value factory and the
+    time spent in them, the reads of fields that have no value, the
+    reads that returned None because of return_none, the hash
+    computations and the mutations made through _set_value. The counts
+    are available as the _counters property of the class, and every
+    instrumented class is listed in instrumented_namedspace_classes.
+    Classes that are not instrumented do no counting at all.
+
+    If the intern argument is True, instances are interned: creating an
+    instance with the same field values as an existing instance of the
+    same class returns the existing instance. Interned instances are
+    held in a pool of weak references, so they are dropped from the
+    pool when they are no longer used elsewhere. The intern_maxsize
+    argument limits the number of instances in the pool. The pool is
+    available as the _intern_pool attribute of the class, and reports
+    hits and misses through its info() method. Only classes without
+    mutable fields can intern their instances.
+
+    If the thread_safe argument is True, instances can be changed by one
+    thread while others read them. Changes are serialized by a
+    reentrant lock of each instance, and each change bumps the version
+    of the instance, available as its _version property. Changes and
+    reads made by field observers during a change are part of it.
+    Readers never take the lock unless a change is in progress. The
+    _snapshot method returns a NamedspaceSnapshot, an immutable copy of
+    the field values at one version, and _field_values,
+    _field_items, _as_dict and repr() are consistent in the same way.
+    The _update method changes several fields as one change.
+
+    If the track_dirty_fields argument is True, each instance keeps a
+    bitmask of the fields that were set or deleted since it was built or
+    last marked clean. The _dirty_fields property gives their names and
+    _dirty_items their stored values, None for deleted fields, so that
+    only the changed fields need to be saved, and _mark_clean() empties the mask. Only classes
+    with mutable fields can track dirty fields.
+
+    Generated classes are cached by their full specification. Calling
+    namedspace() again from the same module with identical arguments
+    returns the class that was built the first time. The cache is
+    available as namedspace_class_cache. It keeps the most recently
+    used classes, up to its maxsize, and reports hits and misses
+    through its info() method.
+
+    The code compiled for generated classes can also be cached on disk,
+    so that defining the same classes in a new process skips generating
+    and compiling their source. This cache is off by default. It is
+    turned on by setting namedspace_code_cache to a NamedspaceCodeCache
+    for a directory, or by setting the NAMEDSPACE_CODE_CACHE_DIR
+    environment variable before namedspace is imported.
+
 
     Here is a simple example, using only the required fields argument:
 
@@ -58,6 +173,9 @@ def namedspace(typename, required_fields=(), optional_fields=(), mutable_fields=
     >>> SimpleNS
     <class 'namedspace.SimpleNS'>
 
+    >>> namedspace("SimpleNS", ("id", "name", "description")) is SimpleNS
+    True
+
     There are built-in properties to access collections and iterators
     associated with the namespace class.
 
@@ -151,6 +269,29 @@ def namedspace(typename, required_fields=(), optional_fields=(), mutable_fields=
     >>> simple_ns._as_dict
     OrderedDict([('id', 1), ('name', 'Simple Name'), ('description', 'Simple Description')])
 
+    Many instances can be built at once by the _make_many class method,
+    from mappings or from sequences of values in field name order.
+
+    >>> SimpleNS._make_many([(2, "Name 2", "Description 2"), {"id": 3, "name": "Name 3", "description": "Description 3"}])
+    [SimpleNS(id=2, name='Name 2', description='Description 2'), SimpleNS(id=3, name='Name 3', description='Description 3')]
+
+    Like a namedtuple, an instance can also be built from positional
+    values in field name order, or from a sequence by the _make class
+    method, and a copy with some values replaced can be made by the
+    _replace method.
+
+    >>> SimpleNS(4, "Name 4", description="Description 4")
+    SimpleNS(id=4, name='Name 4', description='Description 4')
+
+    >>> SimpleNS._make([5, "Name 5", "Description 5"])
+    SimpleNS(id=5, name='Name 5', description='Description 5')
+
+    >>> simple_ns._replace(name="New Name")
+    SimpleNS(id=1, name='New Name', description='Simple Description')
+
+    >>> SimpleNS._field_index("name")
+    1
+
 
     Here is a more complex example, using most of the other arguments:
 
@@ -292,6 +433,26 @@ def namedspace(typename, required_fields=(), optional_fields=(), mutable_fields=
     OrderedDict([('mfg_code', 'ACME'), ('model_code', 'X-500'), ('serial_number', '0000000002'), ('sku', 'ACME_X-500'), ('pk', 'ACME_X-500_0000000002')])
     """
 
+    # For pickling to work, the __module__ variable needs to be set to the frame
+    # where the named tuple is created.  Bypass this step in enviroments where
+    # sys._getframe is not defined (Jython for example) or sys._getframe is not
+    # defined for arguments greater than 0 (IronPython).
+    try:
+        module_name = _sys._getframe(1).f_globals.get('__name__', '__main__')
+    except (AttributeError, ValueError):
+        module_name = None
+
+    # Return the class built by an earlier call with identical arguments
+    class_cache_key = _class_cache_key(module_name, typename,
+            (required_fields, optional_fields, mutable_fields),
+            (default_values, default_value_factories, struct_formats),
+            (bool(return_none), storage, bool(lazy_factories), bool(order), struct_byte_order, bool(instrument),
+                bool(intern), intern_maxsize, bool(thread_safe), bool(track_dirty_fields)))
+    if class_cache_key is not None:
+        result = namedspace_class_cache.get(class_cache_key)
+        if result is not None:
+            return result
+
     # Initialize the list of arguments that will get put into the
     # doc string of the generated class
     arg_list_items = []
@@ -352,46 +513,236 @@ def namedspace(typename, required_fields=(), optional_fields=(), mutable_fields=
         if not callable(factory):
             raise ValueError("Default value factory for '{field_name}' is not callable.".format(field_name=field_name))
 
-    # Fill-in the class template
-    class_definition = _class_template.format(
-        typename=typename,
-        arg_list=", ".join(arg_list_items),
-        )
+    if storage not in _storage_templates:
+        raise ValueError("Value for argument 'storage' must be one of {choices}.".format(
+                choices=", ".join([repr(choice) for choice in sorted(_storage_templates)])))
+
+    if storage == "slots":
+        for field_name in all_fields:
+            if not _slot_name_re.match(field_name) or _keyword.iskeyword(field_name):
+                raise ValueError("Field name '{field_name}' cannot be used with slots storage.".format(
+                        field_name=field_name))
+
+        arg_list_items.append("storage={storage!r}".format(storage=storage))
+
+    if lazy_factories:
+        arg_list_items.append("lazy_factories=True")
+        lazy_fields = frozenset([field_name for field_name in default_value_factories
+                if default_values.get(field_name) is None])
+    else:
+        lazy_fields = frozenset()
+
+    if order:
+        arg_list_items.append("order=True")
+
+    if not isinstance(struct_formats, Mapping):
+        raise ValueError("Value for argument 'struct_formats' must be a mapping.")
+
+    if struct_formats:
+        if frozenset(struct_formats) != all_fields_set:
+            raise ValueError("Value for argument 'struct_formats' must have a format for every field.")
+
+        if struct_byte_order not in _struct_byte_orders:
+            raise ValueError("Value for argument 'struct_byte_order' must be one of {choices}.".format(
+                    choices=", ".join([repr(choice) for choice in _struct_byte_orders])))
+
+        field_structs = []
+        for field_name in all_fields:
+            try:
+                field_struct = _struct.Struct(struct_byte_order + struct_formats[field_name])
+                field_struct_item_count = len(field_struct.unpack("\0" * field_struct.size))
+            except (_struct.error, TypeError):
+                field_struct_item_count = None
+            if field_struct_item_count != 1:
+                raise ValueError("Struct format for '{field_name}' must be a format for a single value.".format(
+                        field_name=field_name))
+            field_structs.append(field_struct)
+
+        field_structs = tuple(field_structs)
+        record_struct = _struct.Struct(struct_byte_order + "".join([field_struct.format[1:]
+                for field_struct in field_structs]))
+        field_offsets = tuple(_accumulate_offsets([field_struct.size for field_struct in field_structs]))
+
+        arg_list_items.append("struct_formats={struct_formats!r}, struct_byte_order={struct_byte_order!r}".format(
+                struct_formats=dict(struct_formats), struct_byte_order=struct_byte_order))
+    else:
+        field_structs = field_offsets = record_struct = None
+
+    if instrument:
+        arg_list_items.append("instrument=True")
+
+    if intern:
+        if mutable_fields:
+            raise ValueError("Instances of a namedspace with mutable fields cannot be interned.")
+
+        if intern_maxsize is not None and (not isinstance(intern_maxsize, (int, long)) or intern_maxsize < 0):
+            raise ValueError("Value for argument 'intern_maxsize' must be None or a non-negative integer.")
+
+        arg_list_items.append("intern=True, intern_maxsize={intern_maxsize!r}".format(intern_maxsize=intern_maxsize))
+
+    if thread_safe:
+        arg_list_items.append("thread_safe=True")
+
+    if track_dirty_fields:
+        if not mutable_fields:
+            raise ValueError("Only a namedspace with mutable fields can track dirty fields.")
+
+        arg_list_items.append("track_dirty_fields=True")
+
+    # Interned instances of slots storage classes need a slot for their
+    # weak references
+    slots = all_fields if locals()["mutable_fields_set"] else all_fields + ("_hash_value",)
+    if intern:
+        slots += ("__weakref__",)
+    if thread_safe:
+        slots += ("_write_version", "_write_lock", "_writer")
+    if track_dirty_fields:
+        slots += ("_dirty_mask",)
+
+    # Generate the part of __init__ that stores the field values and
+    # applies the defaults, specialized for the configuration of each field
+    init_body, init_names = _init_body(typename, all_fields, locals()["required_fields_set"], default_values,
+            default_value_factories, lazy_fields, storage)
+
+    # The source of the class depends only on these arguments. The rest
+    # of the specification is passed in the namespace it runs in.
+    code_cache = namedspace_code_cache
+    if code_cache is not None:
+        code_cache_key = code_cache.key(typename, storage, bool(order), bool(struct_formats), bool(intern),
+                bool(thread_safe), bool(track_dirty_fields), init_body)
+        class_code = code_cache.get(code_cache_key)
+    else:
+        class_code = None
+
+    if class_code is None:
+        # Fill-in the class template
+        storage_template = _storage_templates[storage]
+        class_definition = _class_template.format(
+            typename=typename,
+            storage_definition=storage_template["definition"],
+            storage_init=storage_template["init"].format(instance="self"),
+            init_body=init_body,
+            order_definition=_order_template if order else "",
+            struct_definition=_struct_template if struct_formats else "",
+            thread_safe_definition=_thread_safe_template.format(
+                mark_dirty=_mark_dirty_template.format(indent=" " * 12) if track_dirty_fields else "")
+                if thread_safe else "",
+            dirty_definition=_dirty_template if track_dirty_fields else "",
+            mark_dirty=_mark_dirty_template.format(indent=" " * 8) if track_dirty_fields else "",
+            instance_storage_init=storage_template["init"].format(instance="instance"),
+            interned_instance="cls._intern_pool.intern(instance)" if intern else "instance",
+            )
+
+        try:
+            class_code = compile(class_definition, "<string>", "exec")
+        except SyntaxError as e:
+            raise SyntaxError(e.message + ':\n' + class_definition)
+
+        if code_cache is not None:
+            code_cache.put(code_cache_key, class_code)
 
     # Execute the template string in a temporary namespace and support
     # tracing utilities by setting a value for frame.f_globals['__name__']
     namespace = dict(
         __name__='namedspace_{typename}'.format(typename=typename),
+        class_doc="{typename}({arg_list})".format(typename=typename, arg_list=", ".join(arg_list_items)),
         all_fields=all_fields,
         all_fields_set=all_fields_set,
+        field_indexes=frozendict([(field_name, index) for index, field_name in enumerate(all_fields)]),
+        dirty_bits=dict([(field_name, 1 << index) for index, field_name in enumerate(all_fields)]),
         required_fields_set=locals()["required_fields_set"],
         mutable_fields_set=locals()["mutable_fields_set"],
         default_values=default_values,
         default_value_factories=default_value_factories,
+        slots=slots,
         Hashable=Hashable,
+        Mapping=Mapping,
         MutableMapping=MutableMapping,
         OrderedDict=OrderedDict,
+        object_setattr=object.__setattr__,
+        object_getattribute=object.__getattribute__,
+        deepcopy=_deepcopy,
+        Lock=_threading.Lock,
+        RLock=_threading.RLock,
+        get_ident=_thread.get_ident,
+        NamedspaceSnapshot=NamedspaceSnapshot,
         return_none=return_none,
-        NamedspaceMeta=NamedspaceMeta,
+        lazy_fields=lazy_fields,
+        record_struct=record_struct,
+        field_structs=field_structs,
+        field_offsets=field_offsets,
+        NamedspaceRecordView=NamedspaceRecordView,
+        NamedspaceView=NamedspaceView,
+        NamedspaceMeta=NamedspaceInternMeta if intern else NamedspaceMeta,
+        izip=izip,
+        csv=_csv,
+        json=_json,
+        _newobj=_newobj,
+        _missing=_missing,
+        _row_items=_row_items,
+        _is_immutable_value=_is_immutable_value,
+        _make_parallel=_make_parallel,
+        _chunks=_chunks,
+        _sizeof=_sizeof,
         )
+    namespace.update(init_names)
 
-    #
-    # Code from here down copied verbatim from namedtuple
-    #
-    try:
-        exec class_definition in namespace
-    except SyntaxError as e:
-        raise SyntaxError(e.message + ':\n' + class_definition)
+    exec class_code in namespace
     result = namespace[typename]
 
-    # For pickling to work, the __module__ variable needs to be set to the frame
-    # where the named tuple is created.  Bypass this step in enviroments where
-    # sys._getframe is not defined (Jython for example) or sys._getframe is not
-    # defined for arguments greater than 0 (IronPython).
-    try:
-        result.__module__ = _sys._getframe(1).f_globals.get('__name__', '__main__')
-    except (AttributeError, ValueError):
-        pass
+    if storage == "slots":
+        result._field_slots = frozendict([(field_name, result.__dict__[field_name]) for field_name in all_fields])
+        result._field_slot_descriptors = tuple([result.__dict__[field_name] for field_name in all_fields])
+
+        # Bind the slot setters that the generated __init__ uses
+        namespace["field_slot_setters"] = dict([(field_name, result.__dict__[field_name].__set__)
+                for field_name in all_fields])
+        namespace.update([("set_field_slot_{index}".format(index=index), result.__dict__[field_name].__set__)
+                for index, field_name in enumerate(all_fields)])
+    else:
+        # Give each field its own property, so that reading a field
+        # does not have to fall through to __getattr__. Members of the
+        # class with the same name as a field take precedence.
+        for field_name in all_fields:
+            if not field_name in result.__dict__:
+                setattr(result, field_name, _dict_field_property(field_name))
+
+    # Keep the arguments, so that the class can be built again where it
+    # cannot be imported, such as in worker processes
+    result._namedspace_spec = frozendict(typename=typename, required_fields=required_fields,
+        optional_fields=optional_fields, mutable_fields=mutable_fields, default_values=default_values,
+        default_value_factories=default_value_factories, return_none=return_none, storage=storage,
+        lazy_factories=lazy_factories, order=order, struct_formats=struct_formats,
+        struct_byte_order=struct_byte_order, instrument=instrument, intern=intern, intern_maxsize=intern_maxsize,
+        thread_safe=thread_safe, track_dirty_fields=track_dirty_fields)
+
+    if storage == "dict":
+        # Instances that were never changed are at version 0 and have no
+        # dirty fields. Slots storage classes cannot have a class
+        # attribute with the name of a slot, so they do without these
+        # defaults.
+        if thread_safe:
+            result._write_version = 0
+        if track_dirty_fields:
+            result._dirty_mask = 0
+
+    if intern:
+        result._intern_pool = NamedspaceInternPool(intern_maxsize)
+        result._intern_init = result.__dict__["__init__"]
+        # Keys can only be built from the constructor arguments when no
+        # defaults apply. A plain dict is much faster to search than a
+        # frozendict.
+        result._intern_field_indexes = None if default_values or default_value_factories else dict(
+                result._field_indexes)
+
+    if instrument:
+        _instrument_class(result)
+
+    if module_name is not None:
+        result.__module__ = module_name
+
+    if class_cache_key is not None:
+        namedspace_class_cache.put(class_cache_key, result)
 
     return result
 
@@ -407,11 +758,1074 @@ class NamedspaceMeta(type):
     def _field_names_iter(self):
         return iter(self._all_fields)
 
+    def _field_index(self, field_name):
+        "Return the position of field_name in _field_names."
+        try:
+            return self._field_indexes[field_name]
+        except KeyError:
+            raise self.FieldNameError("Field '{field_name}' does not exist in {typename} namedspace.".format(
+                    field_name=field_name, typename=self.__name__))
+
+    def _where(self, **conditions):
+        """Return a NamedspaceQuery that matches instances by the given field
+        conditions, such as field=value or field__gt=value.
+        """
+        return NamedspaceQuery(self, conditions)
+
+    @property
+    def _counters(self):
+        "The NamedspaceCounters of an instrumented class, or None."
+        return getattr(self, "_instrument_counters", None)
+
+
+class NamedspaceInternMeta(NamedspaceMeta):
+    "Metaclass for namedspace classes that intern their instances"
+
+    def __call__(cls, *args, **kwargs):
+        intern_key = cls._intern_key(args, kwargs)
+        if intern_key is not None:
+            instance = cls._intern_pool.get(intern_key)
+            if instance is not None:
+                return instance
+        return cls._intern_pool.intern(super(NamedspaceInternMeta, cls).__call__(*args, **kwargs))
+
+    def _intern_key(cls, args, kwargs):
+        """Return the intern pool key of an instance built from the
+        constructor arguments, or None if it cannot be known before the
+        instance is built.
+        """
+        field_indexes = cls._intern_field_indexes
+        if field_indexes is None or cls.__init__.im_func is not cls._intern_init.im_func:
+            return None
+
+        field_count = len(cls._all_fields)
+        if len(args) > field_count:
+            return None
+
+        field_values = list(args) + [None] * (field_count - len(args))
+        for field_name, field_value in kwargs.iteritems():
+            index = field_indexes.get(field_name)
+            if index is None or index < len(args):
+                return None
+            field_values[index] = field_value
+        return (cls, _intern_values_key(field_values))
+
+
+def _intern_values_key(field_values):
+    """Return the part of an intern pool key for field_values. Values that
+    compare equal can differ in type, such as 1, 1.0 and True, so each
+    value is paired with its type, including the items of tuples and
+    frozensets.
+    """
+    return tuple([_intern_value_key(field_value) for field_value in field_values])
+
+
+def _intern_value_key(value):
+    "Return value paired with its type, with the items of tuples and frozensets keyed the same way."
+    value_type = type(value)
+    if value_type is tuple:
+        return (value_type, tuple([_intern_value_key(item) for item in value]))
+    elif value_type is frozenset:
+        return (value_type, frozenset([_intern_value_key(item) for item in value]))
+    else:
+        return (value_type, value)
+
+
+class NamedspaceInternInfo(namedtuple("NamedspaceInternInfo", ("hits", "misses", "maxsize", "currsize"))):
+    "Statistics of a NamedspaceInternPool"
+    __slots__ = ()
+
+    @property
+    def hit_rate(self):
+        "The fraction of interned instances that were already in the pool."
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+
+class NamedspaceInternPool(object):
+    """Pool of the interned instances of a namedspace class.
+
+    Instances are keyed on their class and their stored field values,
+    and held by weak references. When the pool holds maxsize instances,
+    new instances are not added to it until others are dropped. A
+    maxsize of None means that the pool is unbounded.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._instances = _weakref.WeakValueDictionary()
+        self._lock = _threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        "Return the interned instance for key, or None."
+        with self._lock:
+            try:
+                instance = self._instances.get(key)
+            except TypeError:
+                return None
+            if instance is not None:
+                self._hits += 1
+            return instance
+
+    def intern(self, instance):
+        "Return the interned instance equal to instance, adding instance to the pool if there is none."
+        key = (type(instance), _intern_values_key(instance.__getstate__()))
+        with self._lock:
+            try:
+                interned_instance = self._instances.get(key)
+            except TypeError:
+                # Instances with unhashable values are never interned
+                return instance
+            if interned_instance is not None:
+                self._hits += 1
+                return interned_instance
+
+            self._misses += 1
+            if self.maxsize is None or len(self._instances) < self.maxsize:
+                self._instances[key] = instance
+            return instance
+
+    def clear(self):
+        "Remove all instances from the pool and reset its statistics."
+        with self._lock:
+            self._instances.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self):
+        "Return the pool statistics as a NamedspaceInternInfo."
+        with self._lock:
+            return NamedspaceInternInfo(self._hits, self._misses, self.maxsize, len(self._instances))
+
+
+class NamedspaceSnapshot(Mapping):
+    """Immutable copy of the field values of a thread-safe namedspace
+    instance, taken at one version of the instance.
+
+    Field values are read as attributes or as items. They are the values
+    the instance gave at that version, with defaults and factories
+    applied, and fields without a value read as None.
+    """
+
+    __slots__ = ("_namedspace_class", "_field_values", "_version")
+
+    def __init__(self, namedspace_class, field_values, version):
+        object.__setattr__(self, "_namedspace_class", namedspace_class)
+        object.__setattr__(self, "_field_values", tuple(field_values))
+        object.__setattr__(self, "_version", version)
+
+    @property
+    def namedspace_class(self):
+        return self._namedspace_class
+
+    @property
+    def version(self):
+        return self._version
+
+    def __getitem__(self, field_name):
+        try:
+            return self._field_values[self._namedspace_class._field_indexes[field_name]]
+        except KeyError:
+            raise KeyError(field_name)
+
+    def __getattr__(self, field_name):
+        try:
+            return self[field_name]
+        except KeyError:
+            raise AttributeError(field_name)
+
+    def __setattr__(self, attr_name, attr_value):
+        raise TypeError("NamedspaceSnapshot is read-only.")
+
+    def __delattr__(self, attr_name):
+        raise TypeError("NamedspaceSnapshot is read-only.")
+
+    def __iter__(self):
+        return iter(self._namedspace_class._all_fields)
+
+    def __len__(self):
+        return len(self._field_values)
+
+    def __repr__(self):
+        return "{clsname}({typename}, version={version}, {items})".format(clsname=self.__class__.__name__,
+                typename=self._namedspace_class.__name__, version=self._version, items=", ".join(
+                "{name}={value!r}".format(name=name, value=value)
+                for name, value in zip(self._namedspace_class._all_fields, self._field_values)))
+
+
+NamedspaceCacheInfo = namedtuple("NamedspaceCacheInfo", ("hits", "misses", "maxsize", "currsize"))
+
+
+class NamedspaceClassCache(object):
+    """Bounded cache of generated namedspace classes.
+
+    When the cache holds maxsize classes, adding another one evicts the
+    least recently used class. A maxsize of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._classes = OrderedDict()
+        self._lock = _threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        "Return the cached class for key, or None."
+        with self._lock:
+            try:
+                cls = self._classes.pop(key)
+            except KeyError:
+                self._misses += 1
+                return None
+            self._classes[key] = cls
+            self._hits += 1
+            return cls
+
+    def put(self, key, cls):
+        "Cache cls under key, evicting the least recently used classes if needed."
+        with self._lock:
+            self._classes.pop(key, None)
+            if self.maxsize <= 0:
+                return
+            while len(self._classes) >= self.maxsize:
+                self._classes.popitem(last=False)
+            self._classes[key] = cls
+
+    def clear(self):
+        "Remove all classes from the cache and reset its statistics."
+        with self._lock:
+            self._classes.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self):
+        "Return the cache statistics as a NamedspaceCacheInfo."
+        with self._lock:
+            return NamedspaceCacheInfo(self._hits, self._misses, self.maxsize, len(self._classes))
+
+
+namedspace_class_cache = NamedspaceClassCache()
+
+
+NamedspaceCodeCacheInfo = namedtuple("NamedspaceCodeCacheInfo", ("hits", "misses", "directory"))
+
+
+class NamedspaceCodeCache(object):
+    """Cache of the code compiled for generated namedspace classes, kept
+    as one marshalled code object per file in a directory.
+
+    Keys are hashes of the parts of the specification that the source of
+    a class depends on, the templates it is generated from, the source of
+    this module and the Python version, so that changing any of them
+    never loads stale code. Files that cannot be read or written are
+    treated as cache misses. The code in the directory is run as it is,
+    so the directory must only be writable by trusted users.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = _threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def key(self, *source_args):
+        "Return the cache key for the code of a class generated from source_args."
+        return _sha1(_code_cache_salt() + repr(source_args)).hexdigest()
+
+    def _path(self, key):
+        return _os.path.join(self.directory, key + ".code")
+
+    def get(self, key):
+        "Return the cached code object for key, or None."
+        try:
+            with open(self._path(key), "rb") as code_file:
+                code = _marshal.load(code_file)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            code = None
+
+        with self._lock:
+            if code is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return code
+
+    def put(self, key, code):
+        "Cache code under key. The file is written under a temporary name and renamed, so readers never see part of it."
+        try:
+            if not _os.path.isdir(self.directory):
+                _os.makedirs(self.directory)
+            file_descriptor, temporary_path = _tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with _os.fdopen(file_descriptor, "wb") as code_file:
+                    _marshal.dump(code, code_file)
+                _os.rename(temporary_path, self._path(key))
+            except BaseException:
+                _os.remove(temporary_path)
+                raise
+        except (IOError, OSError):
+            pass
+
+    def clear(self):
+        "Remove all code files from the directory and reset the statistics."
+        try:
+            file_names = _os.listdir(self.directory)
+        except OSError:
+            file_names = []
+        for file_name in file_names:
+            if file_name.endswith(".code"):
+                try:
+                    _os.remove(_os.path.join(self.directory, file_name))
+                except OSError:
+                    pass
+
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+
+    def info(self):
+        "Return the cache statistics as a NamedspaceCodeCacheInfo."
+        with self._lock:
+            return NamedspaceCodeCacheInfo(self._hits, self._misses, self.directory)
+
+
+_code_cache_salts = []
+
+
+def _code_cache_salt():
+    "Return the part of every code cache key that depends on this module and the Python version."
+    if not _code_cache_salts:
+        salt = _sha1(_sys.version)
+        salt.update(str(_marshal.version))
+        for template in [_class_template, _order_template, _struct_template, _thread_safe_template,
+                _mark_dirty_template, _dirty_template] + [
+                storage_template["definition"] + storage_template["init"]
+                for _, storage_template in sorted(_storage_templates.iteritems())]:
+            salt.update(template)
+
+        try:
+            with open(_os.path.splitext(__file__)[0] + ".py", "rb") as source_file:
+                salt.update(source_file.read())
+        except (IOError, OSError):
+            pass
+
+        _code_cache_salts.append(salt.hexdigest())
+    return _code_cache_salts[0]
+
+
+namedspace_code_cache = NamedspaceCodeCache(_os.environ["NAMEDSPACE_CODE_CACHE_DIR"]) \
+        if _os.environ.get("NAMEDSPACE_CODE_CACHE_DIR") else None
+
+
+def _class_cache_key(module_name, typename, field_args, mapping_args, other_args):
+    "Return a hashable class cache key for the namedspace() arguments, or None."
+    key = [module_name, typename]
+
+    try:
+        for arg_value in field_args:
+            if isinstance(arg_value, basestring):
+                key.append((arg_value,))
+            elif isinstance(arg_value, Container):
+                key.append(tuple(arg_value))
+            else:
+                return None
+
+        # Values that compare equal can still differ in type, such as 1
+        # and True, so the type of each value is part of the key
+        for arg_value in mapping_args:
+            if not isinstance(arg_value, Mapping):
+                return None
+            key.append(frozenset([(name, type(value), value) for name, value in arg_value.iteritems()]))
+
+        key.extend(other_args)
+        key = tuple(key)
+        hash(key)
+    except TypeError:
+        return None
+
+    return key
+
+
+class NamedspaceCounters(object):
+    """Counters kept by a namedspace class generated with instrument=True.
+
+    The factory_calls and factory_seconds mappings have an item for
+    each field that has a default value factory. Subclasses of an
+    instrumented class share its counters.
+    """
+
+    def __init__(self, factory_field_names):
+        self._factory_field_names = tuple(factory_field_names)
+        self.reset()
+
+    def reset(self):
+        "Set all counters back to zero."
+        self.instances_created = 0
+        self.factory_calls = dict.fromkeys(self._factory_field_names, 0)
+        self.factory_seconds = dict.fromkeys(self._factory_field_names, 0.0)
+        self.get_value_misses = 0
+        self.return_none_fallbacks = 0
+        self.hash_computations = 0
+        self.mutations = 0
+
+    def as_dict(self):
+        "Return the counters as a new dictionary."
+        return dict(
+            instances_created=self.instances_created,
+            factory_calls=dict(self.factory_calls),
+            factory_seconds=dict(self.factory_seconds),
+            get_value_misses=self.get_value_misses,
+            return_none_fallbacks=self.return_none_fallbacks,
+            hash_computations=self.hash_computations,
+            mutations=self.mutations,
+            )
+
+    def __repr__(self):
+        return "{clsname}({counters!r})".format(clsname=self.__class__.__name__, counters=self.as_dict())
+
+
+# All classes generated with instrument=True that are still in use
+instrumented_namedspace_classes = _weakref.WeakSet()
+
+
+def _timed_factory(counters, field_name, factory):
+    "Return a default value factory that calls factory and counts the call and its duration."
+    def timed_factory(namedspace_instance):
+        start_time = _default_timer()
+        try:
+            return factory(namedspace_instance)
+        finally:
+            counters.factory_seconds[field_name] += _default_timer() - start_time
+            counters.factory_calls[field_name] += 1
+
+    return timed_factory
+
+
+def _has_cached_hash(namedspace_instance):
+    "Return True if the hash of namedspace_instance has already been cached."
+    try:
+        object.__getattribute__(namedspace_instance, "_hash_value")
+    except AttributeError:
+        return False
+    return True
+
+
+def _instrument_class(cls):
+    "Replace the counted methods and factories of a generated class with counting versions."
+    counters = NamedspaceCounters(cls._default_value_factories)
+    all_fields_set = cls._all_fields_set
+    get_value = cls.__dict__["_get_value"]
+    set_value = cls.__dict__["_set_value"]
+    compute_hash = cls.__dict__["__hash__"]
+
+    def __new__(cls, *args, **kwargs):
+        counters.instances_created += 1
+        return object.__new__(cls)
+
+    def _get_value(self, field_name):
+        try:
+            field_value = get_value(self, field_name)
+        except self.FieldNameError:
+            if field_name in all_fields_set:
+                counters.get_value_misses += 1
+            raise
+
+        if (field_value is None and self._return_none and field_name in all_fields_set
+                and self._default_values.get(field_name) is None
+                and not field_name in self._default_value_factories
+                and self._read_storage(field_name) is None):
+            counters.return_none_fallbacks += 1
+        return field_value
+
+    def _set_value(self, field_name, field_value):
+        set_value(self, field_name, field_value)
+        counters.mutations += 1
+
+    def __hash__(self):
+        cached = self._cache_hash and _has_cached_hash(self)
+        hash_value = compute_hash(self)
+        if not cached:
+            counters.hash_computations += 1
+        return hash_value
+
+    cls.__new__ = staticmethod(__new__)
+    cls._get_value = _get_value
+    cls._set_value = _set_value
+    cls.__hash__ = __hash__
+    cls._default_value_factories = frozendict([(field_name, _timed_factory(counters, field_name, factory))
+            for field_name, factory in cls._default_value_factories.iteritems()])
+    cls._instrument_counters = counters
+    instrumented_namedspace_classes.add(cls)
+
+
+_struct_byte_orders = ("<", ">", "!", "=")
+
+
+def _accumulate_offsets(sizes):
+    "Yield the offset of each item when items of the given sizes are laid out in order."
+    offset = 0
+    for size in sizes:
+        yield offset
+        offset += size
+
+
+# Marks a field that has no value in a row passed to _make_many()
+_missing = object()
+
+
+def _row_items(field_names, row):
+    "Return (field name, value) pairs for a mapping or a sequence of values in field name order."
+    if isinstance(row, Mapping):
+        return [(field_name, row[field_name]) for field_name in row]
+    elif len(row) > len(field_names):
+        raise ValueError("Row has more values than there are fields.")
+    else:
+        return zip(field_names, row)
+
+
+# The namedspace class that a worker process of _make_parallel() builds
+# instances of
+_parallel_worker_class = None
+
+
+def _parallel_worker_init(module_name, typename, spec):
+    """Import or build the namedspace class for a worker process of
+    _make_parallel(). A module_name of None means that the class is
+    built from spec.
+    """
+    global _parallel_worker_class
+    if module_name is None:
+        _parallel_worker_class = namedspace(**spec)
+    else:
+        __import__(module_name)
+        _parallel_worker_class = getattr(_sys.modules[module_name], typename)
+
+
+def _parallel_worker_make(rows):
+    "Return the stored field values of a new instance for each row, in a worker process."
+    return [instance.__getstate__() for instance in _parallel_worker_class._iter_make(rows)]
+
+
+def _chunks(rows, chunksize):
+    "Yield lists of up to chunksize rows."
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _make_parallel(cls, rows, workers, chunksize):
+    "Build instances of cls from rows in worker processes, as described in _make_parallel()."
+    from multiprocessing import Pool
+
+    if chunksize < 1:
+        raise ValueError("Value for argument 'chunksize' must be at least 1.")
+
+    importable = getattr(_sys.modules.get(cls.__module__), cls.__name__, None) is cls
+    if not importable and not "_namedspace_spec" in cls.__dict__:
+        raise ValueError("Subclass {typename} must be importable to be built in worker processes.".format(
+                typename=cls.__name__))
+
+    intern_pool = getattr(cls, "_intern_pool", None)
+    instances = []
+    if importable:
+        worker_init_args = (cls.__module__, cls.__name__, None)
+    else:
+        worker_init_args = (None, None, cls._namedspace_spec)
+
+    pool = Pool(workers, _parallel_worker_init, worker_init_args)
+    try:
+        for states in pool.imap(_parallel_worker_make, _chunks(rows, chunksize)):
+            for state in states:
+                instance = cls.__new__(cls)
+                instance.__setstate__(state)
+                instances.append(instance if intern_pool is None else intern_pool.intern(instance))
+    finally:
+        pool.terminate()
+
+    return instances
+
+
+def _init_body(typename, all_fields, required_fields_set, default_values, default_value_factories, lazy_fields,
+        storage):
+    """Return the source of the part of __init__ that stores the keyword
+    arguments and applies the defaults, and a dict of the names it uses.
+
+    Each field gets only the code its configuration needs, in field
+    order, so that factories can use the values of earlier fields. The
+    result is the same as looking up each field with _get_value.
+    """
+    names = dict(
+        unknown_field_message="field '{{field_name}} does not exist in the {typename} namedspace.".format(
+                typename=typename),
+        )
+
+    if storage == "dict":
+        lines = [
+            "storage = self._field_value_storage",
+            "for field_name, field_value in kwargs.iteritems():",
+            "    if not field_name in all_fields_set:",
+            "        raise ValueError(unknown_field_message.format(field_name=field_name))",
+            "    storage[field_name] = field_value",
+            ]
+    else:
+        lines = [
+            "for field_name, field_value in kwargs.iteritems():",
+            "    if not field_name in all_fields_set:",
+            "        raise ValueError(unknown_field_message.format(field_name=field_name))",
+            "    if field_value is not None:",
+            "        field_slot_setters[field_name](self, field_value)",
+            ]
+
+    # Slots are written through their member descriptors, so that
+    # subclass properties with the names of fields are bypassed. The
+    # setter names are bound once the class exists.
+    def write_lines(field_name, value, value_may_be_none):
+        if storage == "dict":
+            return ["storage[{field_name!r}] = {value}".format(field_name=field_name, value=value)]
+
+        set_line = "set_field_slot_{index}(self, {value})".format(index=all_fields.index(field_name), value=value)
+        if value_may_be_none:
+            return ["if {value} is not None:".format(value=value), "    " + set_line]
+        else:
+            return [set_line]
+
+    for index, field_name in enumerate(all_fields):
+        required = field_name in required_fields_set
+        default_value = default_values.get(field_name)
+
+        if field_name in lazy_fields:
+            # Lazy factories run when the field is first read
+            if required:
+                lines.append("if kwargs.get({field_name!r}) == '':".format(field_name=field_name))
+                lines.append("    raise ValueError({message!r})".format(
+                        message="A value for field '{field_name}' is required.".format(field_name=field_name)))
+            continue
+
+        if default_value is None and not field_name in default_value_factories:
+            if required:
+                lines.append("field_value = kwargs.get({field_name!r})".format(field_name=field_name))
+            elif storage == "dict":
+                lines.append("if not {field_name!r} in kwargs:".format(field_name=field_name))
+                lines.append("    storage[{field_name!r}] = None".format(field_name=field_name))
+        else:
+            lines.append("field_value = kwargs.get({field_name!r})".format(field_name=field_name))
+            lines.append("if field_value is None:")
+            if default_value is not None:
+                names["default_value_{index}".format(index=index)] = default_value
+                lines.append("    field_value = default_value_{index}".format(index=index))
+            else:
+                # Factories are looked up when they are called, so that
+                # they can be replaced on the class
+                lines.append("    try:")
+                lines.append("        field_value = self._default_value_factories[{field_name!r}](self)".format(
+                        field_name=field_name))
+                lines.append("    except self.FieldNameError:")
+                lines.append("        field_value = None")
+            lines.append("    if not {field_name!r} in kwargs:".format(field_name=field_name))
+            lines.extend("        " + line for line in write_lines(field_name, "field_value", default_value is None))
+
+        if required:
+            lines.append("if field_value in (None, ''):")
+            lines.append("    raise ValueError({message!r})".format(
+                    message="A value for field '{field_name}' is required.".format(field_name=field_name)))
+
+    return "\n".join("        " + line for line in lines), names
+
+
+_immutable_value_types = frozenset([type(None), bool, int, long, float, complex, str, unicode,
+        _date, _datetime, _time, _timedelta])
+
+
+def _is_immutable_value(value):
+    "Return True if value is known to be immutable, including all of the values it contains."
+    value_type = type(value)
+    if value_type in _immutable_value_types:
+        return True
+    elif value_type is tuple or value_type is frozenset:
+        return all(_is_immutable_value(item) for item in value)
+    elif isinstance(value_type, NamedspaceMeta) and not value._mutable_fields_set:
+        return all(_is_immutable_value(item) for item in value.__getstate__())
+    else:
+        return False
+
+
+# Objects that are shared by the whole program and never counted as part
+# of what an instance uses
+_sizeof_shared_ids = frozenset([id(None), id(True), id(False), id(NotImplemented), id(Ellipsis)])
+_sizeof_shared_types = (type, _ModuleType, _FunctionType, _BuiltinFunctionType)
+
+
+def _sizeof(instances, deep):
+    """Return the number of bytes used by the namedspace instances, as
+    described in _sizeof(), counting each object once.
+    """
+    seen = set(_sizeof_shared_ids)
+    total = 0
+    # Objects that are referenced by the instances but not part of them
+    values = []
+
+    for instance in instances:
+        if id(instance) in seen:
+            continue
+        seen.update([id(field_name) for field_name in instance._all_fields])
+        field_value_ids = set([id(field_value) for field_value in instance.__getstate__()])
+
+        # The instance itself, and the dicts and lists that hold its
+        # attributes and field values
+        pending = [instance]
+        while pending:
+            obj = pending.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            total += _sys.getsizeof(obj)
+            # The keys of a dict are attribute or field names
+            referents = obj.values() if type(obj) is dict else _gc.get_referents(obj)
+            for referent in referents:
+                if isinstance(referent, (dict, list)) and not id(referent) in field_value_ids:
+                    pending.append(referent)
+                else:
+                    values.append(referent)
+
+    if deep:
+        while values:
+            obj = values.pop()
+            if id(obj) in seen or isinstance(obj, _sizeof_shared_types):
+                continue
+            seen.add(id(obj))
+            total += _sys.getsizeof(obj)
+            values.extend(_gc.get_referents(obj))
+
+    return total
+
+
+def _dict_field_property(field_name):
+    "Return a property that reads field_name directly from dict storage."
+    def get_field_value(self):
+        field_value = self._field_value_storage.get(field_name)
+        if field_value is None:
+            # A field with no value and no default is left to
+            # __getattr__, which Python calls after any AttributeError,
+            # so that _get_value runs only once.
+            if (self._return_none or field_name in self._default_values
+                    or field_name in self._default_value_factories):
+                return self._get_value(field_name)
+            raise AttributeError(field_name)
+        return field_value
+
+    get_field_value.__name__ = field_name
+    return property(get_field_value)
+
+
+_slot_name_re = _re.compile(r"^(?!__)[A-Za-z_][A-Za-z0-9_]*$")
+
+_storage_templates = dict(
+    dict=dict(
+        init="object_setattr({instance}, '_field_value_storage', OrderedDict())",
+        definition="""\
+    _storage = "dict"
+
+    def _read_storage(self, field_name):
+        return self._field_value_storage.get(field_name)
+
+    def _write_storage(self, field_name, field_value):
+        self._field_value_storage[field_name] = field_value
+
+    def _clear_storage(self, field_name):
+        self._field_value_storage.pop(field_name, None)
+
+    def _same_storage(self, obj):
+        return dict.__eq__(self._field_value_storage, obj._field_value_storage) is True
+
+    def _copy_storage(self, instance):
+        instance._field_value_storage = self._field_value_storage.copy()
+
+    def _load_storage(self, field_values):
+        storage = OrderedDict()
+        object_setattr(self, "_field_value_storage", storage)
+        for field_name, field_value in izip(self._all_fields, field_values):
+            storage[field_name] = field_value
+""",
+        ),
+    slots=dict(
+        init="pass",
+        definition="""\
+    __slots__ = slots
+    _storage = "slots"
+
+    #
+    # None is never written to a slot. An empty slot reads as None, the
+    # same as a None value in dict storage, so that defaults apply.
+    #
+    def _read_storage(self, field_name):
+        try:
+            return self._field_slots[field_name].__get__(self)
+        except AttributeError:
+            return None
+
+    def _write_storage(self, field_name, field_value):
+        if field_value is None:
+            self._clear_storage(field_name)
+        else:
+            self._field_slots[field_name].__set__(self, field_value)
+
+    def _clear_storage(self, field_name):
+        try:
+            self._field_slots[field_name].__delete__(self)
+        except AttributeError:
+            pass
+
+    #
+    # Slot values are read directly when fields are compared, so there
+    # is nothing to gain from comparing the storage first.
+    #
+    def _same_storage(self, obj):
+        return False
+
+    def _copy_storage(self, instance):
+        for field_slot in self._field_slot_descriptors:
+            try:
+                field_slot.__set__(instance, field_slot.__get__(self))
+            except AttributeError:
+                pass
+
+    def _load_storage(self, field_values):
+        for field_slot, field_value in izip(self._field_slot_descriptors, field_values):
+            if field_value is not None:
+                field_slot.__set__(self, field_value)
+""",
+        ),
+    )
+
+_order_template = """
+    #
+    # Ordering API
+    #
+    def __lt__(self, obj):
+        if not isinstance(obj, self.__class__):
+            return NotImplemented
+        for field_name in self._all_fields:
+            self_value = getattr(self, field_name, None)
+            obj_value = getattr(obj, field_name, None)
+            if self_value != obj_value:
+                return self_value < obj_value
+        return False
+
+    def __le__(self, obj):
+        if not isinstance(obj, self.__class__):
+            return NotImplemented
+        for field_name in self._all_fields:
+            self_value = getattr(self, field_name, None)
+            obj_value = getattr(obj, field_name, None)
+            if self_value != obj_value:
+                return self_value < obj_value
+        return True
+
+    def __gt__(self, obj):
+        if not isinstance(obj, self.__class__):
+            return NotImplemented
+        for field_name in self._all_fields:
+            self_value = getattr(self, field_name, None)
+            obj_value = getattr(obj, field_name, None)
+            if self_value != obj_value:
+                return self_value > obj_value
+        return False
+
+    def __ge__(self, obj):
+        if not isinstance(obj, self.__class__):
+            return NotImplemented
+        for field_name in self._all_fields:
+            self_value = getattr(self, field_name, None)
+            obj_value = getattr(obj, field_name, None)
+            if self_value != obj_value:
+                return self_value > obj_value
+        return True
+"""
+
+_struct_template = """
+    #
+    # Binary record API
+    #
+    def _pack(self):
+        'Return the field values packed into a binary record.'
+        return self._struct.pack(*self._field_values)
+
+    def _pack_into(self, buffer, offset=0):
+        'Pack the field values into a binary record in buffer, starting at offset.'
+        self._struct.pack_into(buffer, offset, *self._field_values)
+
+    @classmethod
+    def _unpack_from(cls, buffer, offset=0):
+        'Return a new instance built from the binary record in buffer at offset.'
+        return cls._make(cls._struct.unpack_from(buffer, offset))
+
+    @classmethod
+    def _iter_unpack(cls, buffer, offset=0):
+        'Yield a view of each binary record in buffer, decoding fields only as they are read.'
+        record_size = cls._struct.size
+        if (len(buffer) - offset) % record_size:
+            raise ValueError("Buffer size is not a multiple of the {typename} record size.")
+        for record_offset in xrange(offset, len(buffer), record_size):
+            yield NamedspaceRecordView(cls, buffer, record_offset)
+"""
+
+_thread_safe_template = """
+    #
+    # Thread safety API. The version of an instance is odd while a change
+    # is in progress. A read is consistent if the version is even and
+    # the same before and after it.
+    #
+    # Each instance has its own reentrant write lock, created by its first
+    # change. The class lock only guards the creation.
+    _write_lock_guard = Lock()
+
+    @property
+    def _version(self):
+        # object.__getattribute__ does not fall back to __getattr__ when
+        # the slot is empty
+        try:
+            return object_getattribute(self, "_write_version")
+        except AttributeError:
+            return 0
+
+    def _get_write_lock(self):
+        try:
+            return object_getattribute(self, "_write_lock")
+        except AttributeError:
+            with self._write_lock_guard:
+                try:
+                    return object_getattribute(self, "_write_lock")
+                except AttributeError:
+                    write_lock = RLock()
+                    object_setattr(self, "_write_lock", write_lock)
+                    return write_lock
+
+    def _consistent_read(self, read):
+        'Return the version and the result of read(), retrying it until no change overlaps it.'
+        while True:
+            version = self._version
+            if version & 1:
+                # The thread making the change, such as through a field
+                # observer, reads the instance as it is
+                if object_getattribute(self, "_writer") == get_ident():
+                    return version, read()
+                # Wait for the change in progress to finish
+                with self._get_write_lock():
+                    continue
+            result = read()
+            if self._version == version:
+                return version, result
+
+    def _change(self, field_changes):
+        'Apply each (field name, change, change arguments) item as one change.'
+        with self._get_write_lock():
+            version = self._version
+            if version & 1:
+                # A change made by a field observer during a change of this
+                # thread is part of that change
+                self._apply_changes(field_changes)
+                return
+            object_setattr(self, "_writer", get_ident())
+            object_setattr(self, "_write_version", version + 1)
+            try:
+                self._apply_changes(field_changes)
+            finally:
+                object_setattr(self, "_write_version", version + 2)
+
+    def _apply_changes(self, field_changes):
+        for field_name, change, change_args in field_changes:
+            if self._field_observers:
+                self._observed_change(field_name, change, *change_args)
+            else:
+                change(field_name, *change_args){mark_dirty}
+
+    def _set_value(self, field_name, field_value):
+        self._validate_field_mutability(field_name)
+        self._change([(field_name, self._write_storage, (field_value,))])
+
+    def _del_value(self, field_name):
+        self._validate_field_mutability(field_name)
+        self._change([(field_name, self._clear_storage, ())])
+
+    def _update(self, **field_values):
+        'Set the values of several fields as one change, so that readers see all of them or none.'
+        for field_name in field_values:
+            self._validate_field_mutability(field_name)
+        self._change([(field_name, self._write_storage, (field_value,))
+                for field_name, field_value in field_values.iteritems()])
+
+    def _snapshot(self):
+        'Return a NamedspaceSnapshot of the field values at one version.'
+        version, field_values = self._consistent_read(lambda: tuple(self._field_values_iter))
+        return NamedspaceSnapshot(self.__class__, field_values, version)
+
+    @property
+    def _field_values(self):
+        return self._consistent_read(lambda: tuple(self._field_values_iter))[1]
+
+    @property
+    def _field_items(self):
+        return self._consistent_read(lambda: list(self._field_items_iter))[1]
+
+    @property
+    def _as_dict(self):
+        'Return a the namedspace values as a new ordered dictionary.'
+        return OrderedDict(self._field_items)
+"""
+
+# Code added to _set_value and _del_value to mark the changed field as
+# dirty. It is inlined, since a method call would cost as much as the
+# rest of the change.
+_mark_dirty_template = """
+{indent}try:
+{indent}    dirty_mask = object_getattribute(self, "_dirty_mask")
+{indent}except AttributeError:
+{indent}    dirty_mask = 0
+{indent}object_setattr(self, "_dirty_mask", dirty_mask | dirty_bits[field_name])"""
+
+_dirty_template = """
+    #
+    # Dirty field API. Setting or deleting a field sets the bit at the
+    # index of the field in the dirty mask of the instance.
+    #
+    def _get_dirty_mask(self):
+        # object.__getattribute__ does not fall back to __getattr__ when
+        # the slot is empty
+        try:
+            return object_getattribute(self, "_dirty_mask")
+        except AttributeError:
+            return 0
+
+    @property
+    def _dirty_fields(self):
+        'The names of the fields changed since the instance was built or last marked clean, in field order.'
+        dirty_mask = self._get_dirty_mask()
+        return tuple([field_name for index, field_name in enumerate(self._all_fields) if dirty_mask >> index & 1])
+
+    @property
+    def _dirty_items(self):
+        '''The (name, stored value) pairs of the dirty fields. Defaults are
+        not applied, so deleted fields give None.
+        '''
+        return [(field_name, self._read_storage(field_name)) for field_name in self._dirty_fields]
+
+    def _mark_clean(self):
+        'Forget which fields were changed, typically after saving them.'
+        object_setattr(self, "_dirty_mask", 0)
+"""
 
 _class_template = """\
 class {typename}(object):
     __metaclass__ = NamedspaceMeta
-    "{typename}({arg_list})"
+    __doc__ = class_doc
 
     class FieldNameError(AttributeError, KeyError): pass
     class ReadOnlyNamedspaceError(TypeError): pass
@@ -420,32 +1834,278 @@ class {typename}(object):
 
     _all_fields = all_fields
     _all_fields_set = all_fields_set
+    _field_indexes = field_indexes
     _required_fields_set = required_fields_set
     _mutable_fields_set = mutable_fields_set
     _default_values = default_values
     _default_value_factories = default_value_factories
     _return_none = return_none
+    _lazy_fields = lazy_fields
+    _struct = record_struct
+    _field_structs = field_structs
+    _field_offsets = field_offsets
+    _cache_hash = True
+    _field_observers = None
+
+{storage_definition}
+    def __init__(self, *args, **kwargs):
+        {storage_init}
+
+        if args:
+            if len(args) > len(self._all_fields):
+                raise ValueError("{typename} namedspace has only {{field_count}} fields.".format(
+                        field_count=len(self._all_fields)))
+            for field_name, field_value in izip(self._all_fields, args):
+                if field_name in kwargs:
+                    raise ValueError("Got multiple values for field '{{field_name}}'.".format(field_name=field_name))
+                kwargs[field_name] = field_value
+
+{init_body}
+    @classmethod
+    def _make_many(cls, rows):
+        '''Return a list of new instances, one for each row.
+
+        Each row is either a mapping of field names to values, or a
+        sequence of values in field name order.
+        '''
+        return list(cls._iter_make(rows))
+
+    @classmethod
+    def _iter_make(cls, rows):
+        'Yield a new instance for each row, like _make_many.'
+        if cls.__init__.im_func is not {typename}.__dict__["__init__"]:
+            for row in rows:
+                yield cls(**dict(_row_items(cls._all_fields, row)))
+            return
+
+        field_count = len(cls._all_fields)
+        missing_values = (_missing,) * field_count
+        # The values that each field cannot have. The factory of a lazy
+        # required field has not run yet, so only an empty string is
+        # known to be missing, the same as in __init__.
+        plan = tuple((field_name, cls._default_values.get(field_name),
+                None if field_name in cls._lazy_fields else cls._default_value_factories.get(field_name),
+                () if not field_name in cls._required_fields_set else ("",) if field_name in cls._lazy_fields
+                    else (None, ""))
+                for field_name in cls._all_fields)
+        write_storage = cls._write_storage
+
+        for row in rows:
+            if isinstance(row, Mapping):
+                for field_name in row:
+                    if not field_name in cls._all_fields_set:
+                        raise ValueError("field '{{field_name}} does not exist in the {typename} namedspace.".format(
+                                field_name=field_name))
+                values = [row[field_name] if field_name in row else _missing for field_name in cls._all_fields]
+            elif len(row) > field_count:
+                raise ValueError("{typename} namedspace has only {{field_count}} fields.".format(
+                        field_count=field_count))
+            else:
+                values = tuple(row) + missing_values[len(row):]
+
+            instance = cls.__new__(cls)
+            {instance_storage_init}
+
+            for field_name, field_value in izip(cls._all_fields, values):
+                if field_value is not _missing:
+                    write_storage(instance, field_name, field_value)
+
+            for (field_name, default_value, factory, empty_values), field_value in izip(plan, values):
+                if field_value is None or field_value is _missing:
+                    if default_value is not None:
+                        default_value_or_none = default_value
+                    elif factory is not None:
+                        try:
+                            default_value_or_none = factory(instance)
+                        except cls.FieldNameError:
+                            default_value_or_none = None
+                    else:
+                        default_value_or_none = None
+
+                    if field_value is _missing:
+                        write_storage(instance, field_name, default_value_or_none)
+                    field_value = default_value_or_none
+
+                if empty_values and field_value in empty_values:
+                    raise ValueError("A value for field '{{field_name}}' is required.".format(field_name=field_name))
+
+            yield {interned_instance}
+
+    @classmethod
+    def _make_concurrent(cls, rows, concurrency=8, chunksize=None):
+        '''Return a list of new instances, one for each row, like _make_many.
+
+        The rows are split into chunks of chunksize rows, which are built
+        by a pool of at most concurrency threads, so that default value
+        factories that wait on I/O, such as cache or service lookups,
+        wait at the same time. The rows of each chunk are built one after
+        another, and the factories of each row are called in field order.
+        By default, the rows are split into about four chunks per thread.
+        '''
+        from multiprocessing.pool import ThreadPool
+
+        if concurrency < 1:
+            raise ValueError("Value for argument 'concurrency' must be at least 1.")
+
+        if chunksize is None:
+            rows = list(rows)
+            chunksize, extra = divmod(len(rows), concurrency * 4)
+            if extra:
+                chunksize += 1
+        elif chunksize < 1:
+            raise ValueError("Value for argument 'chunksize' must be at least 1.")
+
+        pool = ThreadPool(concurrency)
+        try:
+            chunks = pool.map(lambda chunk: list(cls._iter_make(chunk)), _chunks(rows, chunksize), chunksize=1)
+        finally:
+            pool.terminate()
+        return [instance for chunk in chunks for instance in chunk]
+
+    @classmethod
+    def _make_parallel(cls, rows, workers=None, chunksize=10000):
+        '''Return a list of new instances, one for each row, like _make_many.
+
+        The rows are split into chunks of chunksize rows, which are built
+        and checked by a pool of worker processes, by default one per
+        CPU. The workers send back only the field values, from which the
+        instances are rebuilt. A class that cannot be imported by its
+        module and name is built again in the workers from the arguments
+        that namedspace() was called with, which needs worker processes
+        that are forked, and subclasses must be importable.
+        '''
+        return _make_parallel(cls, rows, workers, chunksize)
+
+    @classmethod
+    def _make(cls, iterable):
+        'Return a new instance built from a sequence or iterable of values in field name order.'
+        return cls._make_many((tuple(iterable),))[0]
 
-    def __init__(self, **kwargs):
-        self._field_value_storage = OrderedDict()
+    #
+    # Streaming API
+    #
+    @classmethod
+    def _iter_csv(cls, fileobj, **reader_kwargs):
+        '''Yield a new instance for each row of a CSV file.
+
+        The first row of the file must name the field of each column,
+        and name each field only once. Empty values, and the values
+        missing from rows shorter than the first row, are read as missing
+        values, and all other values are read as strings. Any other
+        keyword arguments are passed to csv.reader.
+        '''
+        reader = csv.reader(fileobj, **reader_kwargs)
+        try:
+            header = next(reader)
+        except StopIteration:
+            return
 
-        for field_name, field_value in kwargs.iteritems():
-            if field_name in self._all_fields_set:
-                self._field_value_storage[field_name] = field_value
-            else:
+        column_indexes = [None] * len(cls._all_fields)
+        for column_index, field_name in enumerate(header):
+            try:
+                field_index = cls._field_indexes[field_name]
+            except KeyError:
                 raise ValueError("field '{{field_name}} does not exist in the {typename} namedspace.".format(
                         field_name=field_name))
+            if column_indexes[field_index] is not None:
+                raise ValueError("field '{{field_name}}' appears more than once in the CSV header.".format(
+                        field_name=field_name))
+            column_indexes[field_index] = column_index
 
-        for field_name in self._field_names:
-            try:
-                field_value = self._get_value(field_name)
-            except self.FieldNameError:
-                field_value = None
+        # _iter_make reads the values missing from short rows in field
+        # order as missing values. Other rows are padded to match.
+        if column_indexes == range(len(header)):
+            rows = ([field_value or None for field_value in row] for row in reader)
+        else:
+            padding = [_missing] * len(header)
+            rows = ([_missing if column_index is None else row[column_index] or None
+                    for column_index in column_indexes]
+                    for row in (row if len(row) >= len(header) else row + padding[len(row):] for row in reader))
+
+        for instance in cls._iter_make(rows):
+            yield instance
+
+    @classmethod
+    def _iter_jsonl(cls, fileobj):
+        '''Yield a new instance for each line of a JSON lines file.
+
+        Each line is either an object that maps field names to values,
+        or an array of values in field name order. Blank lines are
+        skipped.
+        '''
+        rows = (json.loads(line) for line in fileobj if line.strip())
+        for instance in cls._iter_make(rows):
+            yield instance
+
+    @classmethod
+    def _write_csv(cls, fileobj, instances, **writer_kwargs):
+        '''Write a header row and then a row for each instance to a CSV file.
+
+        Missing values are written as empty values. Any other keyword
+        arguments are passed to csv.writer.
+        '''
+        writer = csv.writer(fileobj, **writer_kwargs)
+        writer.writerow(cls._all_fields)
+        writer.writerows(instance._field_values for instance in instances)
+
+    @classmethod
+    def _write_jsonl(cls, fileobj, instances):
+        'Write a JSON object for each instance to a JSON lines file.'
+        encode = json.JSONEncoder().encode
+        for instance in instances:
+            fileobj.write(encode(OrderedDict(izip(cls._all_fields, instance._field_values_iter))))
+            fileobj.write("\\n")
+
+    def _replace(self, **changes):
+        '''Return a new instance with the values of the given fields replaced.
+
+        The new instance starts with a copy of the stored values of this
+        instance, so only the replaced values are checked.
+        '''
+        cls = self.__class__
+        for field_name in changes:
+            if not field_name in self._all_fields_set:
+                raise ValueError("field '{{field_name}} does not exist in the {typename} namedspace.".format(
+                        field_name=field_name))
 
-            if field_value in (None, "") and field_name in self._required_fields_set:
-                raise ValueError("A value for field '{{field_name}}' is required.".format(field_name=field_name))
-            elif not field_name in self._field_value_storage:
-                self._field_value_storage[field_name] = field_value
+        if cls.__init__.im_func is not {typename}.__dict__["__init__"]:
+            field_values = [self._read_storage(field_name) for field_name in self._all_fields]
+            for field_name, field_value in changes.iteritems():
+                field_values[self._field_indexes[field_name]] = field_value
+            return self._make(field_values)
+
+        instance = cls.__new__(cls)
+        self._copy_storage(instance)
+        for field_name, field_value in changes.iteritems():
+            instance._write_storage(field_name, field_value)
+            if (field_value in (None, "") and field_name in self._required_fields_set
+                    and not field_name in self._lazy_fields):
+                try:
+                    field_value = instance._get_value(field_name)
+                except self.FieldNameError:
+                    field_value = None
+                if field_value in (None, ""):
+                    raise ValueError("A value for field '{{field_name}}' is required.".format(field_name=field_name))
+
+        return {interned_instance}
+
+    #
+    # Copy API
+    #
+    def __copy__(self):
+        if not self._mutable_fields_set:
+            return self
+        instance = self.__class__.__new__(self.__class__)
+        self._copy_storage(instance)
+        return instance
+
+    def __deepcopy__(self, memo):
+        if _is_immutable_value(self):
+            return self
+        instance = self.__class__.__new__(self.__class__)
+        memo[id(self)] = instance
+        instance.__setstate__(deepcopy(self.__getstate__(), memo))
+        return instance
 
     def __repr__(self):
         'Return a nicely formatted representation string'
@@ -453,6 +2113,27 @@ class {typename}(object):
             items=", ".join("{{name}}={{value!r}}".format(name=name, value=value)
                 for name, value in self._field_items))
 
+    #
+    # Memory API
+    #
+    def _sizeof(self, deep=False):
+        '''Return the number of bytes used by the instance, its __dict__ and
+        the dicts and lists that store its field values. With deep, the
+        field values and other attributes, and everything that they
+        reference, are counted too. Each object is counted once, and
+        classes, modules, functions and the field names are never counted.
+        '''
+        return _sizeof((self,), deep)
+
+    @classmethod
+    def _sizeof_many(cls, instances, deep=False):
+        '''Return the number of bytes used by the instances, counted as in
+        _sizeof. Objects shared by several instances, and instances that
+        appear more than once, such as interned instances, are counted
+        once.
+        '''
+        return _sizeof(instances, deep)
+
     #
     # Generic value access methods
     #
@@ -461,7 +2142,7 @@ class {typename}(object):
             raise self.FieldNameError("Field '{{field_name}}' does not exist in the {typename} namedspace.".format(
                     field_name=field_name))
 
-        field_value = self._field_value_storage.get(field_name)
+        field_value = self._read_storage(field_name)
         if field_value is None:
             field_value = self._default_values.get(field_name)
             if field_value is None:
@@ -474,6 +2155,11 @@ class {typename}(object):
                                 " namedspace instance.".format(field_name=field_name))
                 else:
                     field_value = factory(self)
+                    if field_name in self._lazy_fields:
+                        if field_value in (None, "") and field_name in self._required_fields_set:
+                            raise ValueError("A value for field '{{field_name}}' is required.".format(
+                                    field_name=field_name))
+                        self._write_storage(field_name, field_value)
 
         return field_value
 
@@ -490,11 +2176,39 @@ class {typename}(object):
 
     def _set_value(self, field_name, field_value):
         self._validate_field_mutability(field_name)
-        self._field_value_storage[field_name] = field_value
+        if self._field_observers:
+            self._observed_change(field_name, self._write_storage, field_value)
+        else:
+            self._write_storage(field_name, field_value){mark_dirty}
 
     def _del_value(self, field_name):
         self._validate_field_mutability(field_name)
-        del self._field_value_storage[field_name]
+        if self._field_observers:
+            self._observed_change(field_name, self._clear_storage)
+        else:
+            self._clear_storage(field_name){mark_dirty}
+
+    #
+    # Field observers, such as indexes, are told about each change of a
+    # field value. _field_changing(instance, field_name) returns True if
+    # the observer needs to hear _field_changed(instance) afterwards. If
+    # that fails, the old value is restored and every observer is told
+    # about the change back.
+    #
+    def _observed_change(self, field_name, change, *change_args):
+        old_field_value = self._read_storage(field_name)
+        observers = [observer for observer in list(self._field_observers)
+                if observer._field_changing(self, field_name)]
+        change(field_name, *change_args)
+        try:
+            for observer in observers:
+                observer._field_changed(self)
+        except:
+            self._write_storage(field_name, old_field_value)
+            for observer in observers:
+                observer._field_changing(self, field_name)
+                observer._field_changed(self)
+            raise
 
     #
     # Namedspace API
@@ -530,6 +2244,23 @@ class {typename}(object):
         'Return a the namedspace values as a new ordered dictionary.'
         return OrderedDict(self._field_items_iter)
 
+    #
+    # Pickle API
+    #
+    def __reduce__(self):
+        return (_newobj, (self.__class__,), self.__getstate__())
+
+    def __getstate__(self):
+        'Return the stored field values as a tuple in field name order.'
+        return tuple([self._read_storage(field_name) for field_name in self._all_fields])
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # Pickles written before 1.3.0 hold the instance __dict__
+            field_value_storage = state["_field_value_storage"]
+            state = [field_value_storage.get(field_name) for field_name in self._all_fields]
+        self._load_storage(state)
+
     #
     # Attribute API
     #
@@ -554,6 +2285,13 @@ class {typename}(object):
     def __hash__(self):
         if self._mutable_fields_set:
             raise self.MutableNamedspaceError("Mutable {typename} namedspace instance is not hashable.")
+        elif self._cache_hash:
+            try:
+                return self._hash_value
+            except AttributeError:
+                hash_value = hash(self._field_values)
+                super({typename}, self).__setattr__("_hash_value", hash_value)
+                return hash_value
         else:
             return hash(self._field_values)
 
@@ -561,8 +2299,23 @@ class {typename}(object):
     # Needed along with Hashable API to use this instance as dictionary key
     #
     def __eq__(self, obj):
-        return isinstance(obj, self.__class__) and obj._field_items == self._field_items
-
+        if obj is self:
+            return True
+        elif not isinstance(obj, self.__class__):
+            # Views of instances, such as table rows, compare themselves
+            return NotImplemented if isinstance(obj, NamedspaceView) else False
+        elif (type(obj) is type(self) and self._cache_hash and not self._lazy_fields
+                and self._same_storage(obj)):
+            return True
+
+        for field_name in self._all_fields:
+            if getattr(self, field_name, None) != getattr(obj, field_name, None):
+                return False
+        return True
+
+    def __ne__(self, obj):
+        return not self == obj
+{order_definition}{struct_definition}{thread_safe_definition}{dirty_definition}
     #
     # MutableMapping API
     #
@@ -591,3 +2344,10 @@ class {typename}(object):
 Hashable.register({typename})
 MutableMapping.register({typename})
 """
+
+
+from namedspace.index import NamedspaceIndex
+from namedspace.query import NamedspaceQuery
+from namedspace.table import NamedspaceTable
+from namedspace.record import NamedspaceRecordView
+from namedspace.view import NamedspaceView
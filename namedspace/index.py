@@ -0,0 +1,242 @@
+"""Secondary indexes over collections of instances of one namedspace class.
+
+A NamedspaceIndex maps the values of one or more fields to the
+instances that have them. Hash indexes find the instances with a given
+key, and sorted indexes also find the instances with keys in a range.
+
+>>> from namedspace import namedspace
+>>> Order = namedspace("Order", ("order_id", "customer", "total"), mutable_fields="total")
+>>> orders = [Order(1, "ACME", 250), Order(2, "Initech", 100), Order(3, "ACME", 75)]
+>>> by_customer = NamedspaceIndex(Order, "customer", orders)
+>>> by_customer.lookup("ACME")
+[Order(order_id=1, customer='ACME', total=250), Order(order_id=3, customer='ACME', total=75)]
+
+>>> by_total = NamedspaceIndex(Order, "total", orders, sorted=True)
+>>> by_total.range(80, 300)
+[Order(order_id=2, customer='Initech', total=100), Order(order_id=1, customer='ACME', total=250)]
+
+Indexes on mutable fields follow changes to the instances they hold.
+
+>>> orders[2].total = 150
+>>> by_total.range(80, 300)
+[Order(order_id=2, customer='Initech', total=100), Order(order_id=3, customer='ACME', total=150), Order(order_id=1, customer='ACME', total=250)]
+"""
+from bisect import bisect_left
+from bisect import bisect_right
+from weakref import WeakSet
+
+from namedspace import NamedspaceMeta
+
+
+class NamedspaceIndex(object):
+    """Index of instances of one namedspace class by the values of some of
+    its fields.
+
+    The field_names argument can be a string or a sequence of strings.
+    With one field, keys are the values of the field. With several
+    fields, keys are tuples of their values in the given order. Fields
+    without a value have None in their keys.
+
+    A hash index, the default, finds the instances with a given key. A
+    sorted index, built with sorted=True, keeps its instances in key
+    order and also finds the instances with keys in a range. A unique
+    index, built with unique=True, holds at most one instance per key.
+
+    When indexed fields are mutable, the index moves its instances to
+    their new keys when those fields are set or deleted. A change that
+    would give a unique index a duplicate key is undone and raises a
+    ValueError.
+    """
+
+    def __init__(self, namedspace_class, field_names, instances=(), sorted=False, unique=False):
+        if not isinstance(namedspace_class, NamedspaceMeta):
+            raise ValueError("Value for argument 'namedspace_class' must be a namedspace class.")
+
+        if isinstance(field_names, basestring):
+            field_names = (field_names,)
+        field_names = tuple(field_names)
+        if not field_names:
+            raise ValueError("At least one field must be indexed.")
+        for field_name in field_names:
+            if not field_name in namedspace_class._all_fields_set:
+                raise ValueError("Value for argument 'field_names' contains invalid field '{field_name}'.".format(
+                        field_name=field_name))
+
+        self._namedspace_class = namedspace_class
+        self._field_names = field_names
+        self._field_names_set = frozenset(field_names)
+        self._sorted = bool(sorted)
+        self._unique = bool(unique)
+
+        # Keys by instance id, for removing instances whatever their
+        # current field values are
+        self._keys = {}
+        if self._sorted:
+            self._sorted_keys = []
+            self._sorted_instances = []
+        else:
+            self._instances = {}
+
+        if namedspace_class._mutable_fields_set & self._field_names_set:
+            self._observe(namedspace_class)
+
+        for instance in instances:
+            self.add(instance)
+
+    def _observe(self, namedspace_class):
+        "Register the index to hear about field changes of instances of namedspace_class."
+        for cls in namedspace_class.__mro__:
+            if "_field_observers" in cls.__dict__:
+                if cls._field_observers is None:
+                    cls._field_observers = WeakSet()
+                cls._field_observers.add(self)
+                return
+
+    @property
+    def namedspace_class(self):
+        return self._namedspace_class
+
+    @property
+    def field_names(self):
+        return self._field_names
+
+    def __repr__(self):
+        return "{clsname}({typename}, {field_names!r}, {length} instances{sorted}{unique})".format(
+                clsname=self.__class__.__name__, typename=self._namedspace_class.__name__,
+                field_names=self._field_names, length=len(self._keys),
+                sorted=", sorted" if self._sorted else "", unique=", unique" if self._unique else "")
+
+    def _key(self, instance):
+        "Return the key of instance in the index."
+        if len(self._field_names) == 1:
+            return getattr(instance, self._field_names[0], None)
+        else:
+            return tuple([getattr(instance, field_name, None) for field_name in self._field_names])
+
+    #
+    # Instance management
+    #
+    def add(self, instance):
+        "Add instance to the index. Adding an instance that is already in the index does nothing."
+        if not isinstance(instance, self._namedspace_class):
+            raise ValueError("Instances must be {typename} instances.".format(
+                    typename=self._namedspace_class.__name__))
+        if id(instance) in self._keys:
+            return
+
+        key = self._key(instance)
+        if self._sorted:
+            start = bisect_left(self._sorted_keys, key)
+            if self._unique and start < len(self._sorted_keys) and self._sorted_keys[start] == key:
+                raise ValueError("Key {key!r} is already in the unique index.".format(key=key))
+            end = bisect_right(self._sorted_keys, key, start)
+            self._sorted_keys.insert(end, key)
+            self._sorted_instances.insert(end, instance)
+        elif self._unique:
+            if key in self._instances:
+                raise ValueError("Key {key!r} is already in the unique index.".format(key=key))
+            self._instances[key] = instance
+        else:
+            self._instances.setdefault(key, []).append(instance)
+
+        self._keys[id(instance)] = key
+
+    def discard(self, instance):
+        "Remove instance from the index if it is in the index."
+        try:
+            key = self._keys.pop(id(instance))
+        except KeyError:
+            return
+
+        if self._sorted:
+            start = bisect_left(self._sorted_keys, key)
+            end = bisect_right(self._sorted_keys, key, start)
+            for position in xrange(start, end):
+                if self._sorted_instances[position] is instance:
+                    del self._sorted_keys[position]
+                    del self._sorted_instances[position]
+                    break
+        elif self._unique:
+            del self._instances[key]
+        else:
+            instances = self._instances[key]
+            for position, indexed_instance in enumerate(instances):
+                if indexed_instance is instance:
+                    del instances[position]
+                    break
+            if not instances:
+                del self._instances[key]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        "Iterate over the instances, in key order for a sorted index."
+        if self._sorted:
+            return iter(list(self._sorted_instances))
+        elif self._unique:
+            return iter(self._instances.values())
+        else:
+            return iter([instance for instances in self._instances.itervalues() for instance in instances])
+
+    def __contains__(self, instance):
+        return id(instance) in self._keys
+
+    #
+    # Field observer API, used by instances of mutable namedspace classes
+    #
+    def _field_changing(self, instance, field_name):
+        if field_name in self._field_names_set and id(instance) in self._keys:
+            self.discard(instance)
+            return True
+        return False
+
+    def _field_changed(self, instance):
+        self.add(instance)
+
+    #
+    # Queries
+    #
+    def lookup(self, key):
+        "Return a list of the instances with the given key."
+        if self._sorted:
+            start = bisect_left(self._sorted_keys, key)
+            end = bisect_right(self._sorted_keys, key, start)
+            return self._sorted_instances[start:end]
+        elif self._unique:
+            return [self._instances[key]] if key in self._instances else []
+        else:
+            return list(self._instances.get(key, ()))
+
+    def __getitem__(self, key):
+        """Return the instance with the given key in a unique index, or a
+        list of the instances with the given key in any other index.
+        """
+        instances = self.lookup(key)
+        if not instances:
+            raise KeyError(key)
+        return instances[0] if self._unique else instances
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        """Return a list of the instances with keys from low to high, in key
+        order, from a sorted index. A low or high of None leaves the range
+        open at that end.
+        """
+        if not self._sorted:
+            raise TypeError("Range queries need a sorted index.")
+
+        if low is None:
+            start = 0
+        elif include_low:
+            start = bisect_left(self._sorted_keys, low)
+        else:
+            start = bisect_right(self._sorted_keys, low)
+
+        if high is None:
+            end = len(self._sorted_keys)
+        elif include_high:
+            end = bisect_right(self._sorted_keys, high, start)
+        else:
+            end = bisect_left(self._sorted_keys, high, start)
+
+        return self._sorted_instances[start:end]
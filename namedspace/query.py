@@ -0,0 +1,225 @@
+"""Compiled queries over collections of instances of one namedspace class.
+
+The _where class method of a namedspace class returns a
+NamedspaceQuery for the given conditions. Each keyword argument names a
+field, optionally followed by a double underscore and an operator.
+
+>>> from namedspace import namedspace
+>>> Trade = namedspace("Trade", ("symbol", "side", "quantity"))
+>>> trades = [Trade("ABC", "buy", 100), Trade("XYZ", "sell", 250), Trade("ABC", "sell", 300)]
+>>> large_abc_trades = Trade._where(symbol="ABC", quantity__gt=150)
+>>> list(large_abc_trades(trades))
+[Trade(symbol='ABC', side='sell', quantity=300)]
+
+A query runs lazily over any iterable of instances, and can yield the
+values of some of the fields of each matching instance instead of the
+instances themselves.
+
+>>> list(Trade._where(side="sell").values(trades, "symbol", "quantity"))
+[('XYZ', 250), ('ABC', 300)]
+
+>>> Trade._where(quantity__ge=250).count_by(trades, "side")
+Counter({'sell': 2})
+"""
+import re
+
+from collections import Counter
+from keyword import iskeyword
+
+from namedspace import NamedspaceMeta
+
+
+# Expressions for the supported operators, in terms of the field value
+# and the operand. A field without a value contains nothing.
+_operator_expressions = dict(
+    eq="{value} == {operand}",
+    ne="{value} != {operand}",
+    lt="{value} < {operand}",
+    le="{value} <= {operand}",
+    gt="{value} > {operand}",
+    ge="{value} >= {operand}",
+    contains="{value} is not None and {operand} in {value}",
+)
+_operator_expressions["in"] = "{value} in {operand}"
+
+_identifier_re = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class NamedspaceQuery(object):
+    """Filter over instances of one namedspace class, compiled from a set
+    of field conditions.
+
+    Each condition is given as field=operand or field__operator=operand.
+    The operators are eq, the default, ne, lt, le, gt, ge, in, contains
+    and isnone, which matches a field without a value if its operand is
+    true and a field with a value otherwise. Fields without a value are
+    compared as None, and never match contains. An instance matches if
+    it meets all of the conditions.
+
+    The conditions are compiled into a function when the query is built.
+    For instances of exactly a dict storage namedspace class, that
+    function reads the field values from the instance storage instead of
+    through attribute access. Other instances, including instances of
+    subclasses, are read through attribute access.
+    """
+
+    def __init__(self, namedspace_class, conditions):
+        if not isinstance(namedspace_class, NamedspaceMeta):
+            raise ValueError("Value for argument 'namedspace_class' must be a namedspace class.")
+
+        self._namedspace_class = namedspace_class
+        self._conditions = []
+        for condition, operand in sorted(conditions.iteritems()):
+            field_name, _, operator = condition.rpartition("__")
+            if not field_name or not (operator in _operator_expressions or operator == "isnone"):
+                field_name, operator = condition, "eq"
+            namedspace_class._field_index(field_name)
+
+            if operator == "in":
+                try:
+                    operand = frozenset(operand)
+                except TypeError:
+                    operand = tuple(operand)
+            self._conditions.append((field_name, operator, operand))
+
+        self._compiled_functions = {}
+        self._filter = self._compile(None)
+
+    @property
+    def namedspace_class(self):
+        return self._namedspace_class
+
+    def __repr__(self):
+        return "{clsname}({typename}, {conditions})".format(clsname=self.__class__.__name__,
+                typename=self._namedspace_class.__name__, conditions=", ".join(
+                "{field_name}__{operator}={operand!r}".format(field_name=field_name, operator=operator,
+                operand=operand) for field_name, operator, operand in self._conditions))
+
+    def _compile(self, projection):
+        """Return a generator function that takes an iterable of instances
+        and yields the matching instances, or a tuple of the values of the
+        fields in projection for each matching instance.
+        """
+        try:
+            return self._compiled_functions[projection]
+        except KeyError:
+            pass
+
+        namedspace_class = self._namedspace_class
+        namespace = {}
+        lines = []
+
+        # Fields of dict storage instances that are read through the
+        # properties of the generated class can be read from storage
+        # directly. Slots are already read directly by attribute access.
+        storage_fields = frozenset()
+        if namedspace_class._storage == "dict":
+            for cls in namedspace_class.__mro__:
+                if "_all_fields" in cls.__dict__:
+                    storage_fields = frozenset([field_name for field_name in cls._all_fields
+                            if getattr(namedspace_class, field_name, None) is cls.__dict__.get(field_name)])
+                    break
+
+        if storage_fields:
+            namespace["cls"] = namedspace_class
+            lines.append("        if type(instance) is cls:")
+            lines.append("            storage_get = instance._field_value_storage.get")
+            lines.extend(self._body_lines(namespace, projection, storage_fields, "            "))
+            lines.append("        else:")
+            lines.extend(self._body_lines(namespace, projection, frozenset(), "            "))
+        else:
+            lines.extend(self._body_lines(namespace, projection, frozenset(), "        "))
+
+        if projection is None:
+            lines.append("        yield instance")
+        else:
+            lines.append("        yield ({values},)".format(values=", ".join(
+                    "value_{index}".format(index=namedspace_class._field_indexes[field_name])
+                    for field_name in projection)))
+
+        # Everything the function uses is bound as a default argument, so
+        # that it is a fast local variable
+        lines[:0] = [
+            "def compiled_query(instances, {defaults}):".format(defaults=", ".join(
+                    "{name}={name}".format(name=name) for name in sorted(namespace) + ["type", "getattr"])),
+            "    for instance in instances:",
+            ]
+        namespace.update(type=type, getattr=getattr)
+
+        exec "\n".join(lines) in namespace
+        compiled_function = self._compiled_functions[projection] = namespace["compiled_query"]
+        return compiled_function
+
+    def _body_lines(self, namespace, projection, storage_fields, indent):
+        "Return the lines that read field values and skip instances that do not match."
+        field_indexes = self._namedspace_class._field_indexes
+        read_fields = set()
+        lines = []
+
+        def read_lines(field_name):
+            if field_name in read_fields:
+                return []
+            read_fields.add(field_name)
+            value = "value_{index}".format(index=field_indexes[field_name])
+            if field_name in storage_fields:
+                return [
+                    "{value} = storage_get({field_name!r})".format(value=value, field_name=field_name),
+                    "if {value} is None:".format(value=value),
+                    "    {value} = getattr(instance, {field_name!r}, None)".format(value=value,
+                            field_name=field_name),
+                    ]
+            elif _identifier_re.match(field_name) and not iskeyword(field_name):
+                # The same as getattr() with a default of None, but faster
+                return [
+                    "try:",
+                    "    {value} = instance.{field_name}".format(value=value, field_name=field_name),
+                    "except AttributeError:",
+                    "    {value} = None".format(value=value),
+                    ]
+            else:
+                return ["{value} = getattr(instance, {field_name!r}, None)".format(value=value,
+                        field_name=field_name)]
+
+        for condition_index, (field_name, operator, operand) in enumerate(self._conditions):
+            lines.extend(read_lines(field_name))
+            value = "value_{index}".format(index=field_indexes[field_name])
+            if operator == "isnone":
+                expression = "{value} is {negation}None".format(value=value, negation="" if operand else "not ")
+            else:
+                operand_name = "operand_{index}".format(index=condition_index)
+                namespace[operand_name] = operand
+                expression = _operator_expressions[operator].format(value=value, operand=operand_name)
+            lines.append("if not ({expression}):".format(expression=expression))
+            lines.append("    continue")
+
+        for field_name in projection or ():
+            lines.extend(read_lines(field_name))
+
+        return [indent + line for line in lines]
+
+    def _projection(self, field_names):
+        "Return field_names as a tuple after checking that there is at least one and that they are all fields."
+        if not field_names:
+            raise ValueError("At least one field name must be given.")
+        for field_name in field_names:
+            self._namedspace_class._field_index(field_name)
+        return tuple(field_names)
+
+    def __call__(self, instances):
+        "Return an iterator over the instances that match the query."
+        return self._filter(instances)
+
+    def values(self, instances, *field_names):
+        "Return an iterator over tuples of the values of field_names of the instances that match the query."
+        return self._compile(self._projection(field_names))(instances)
+
+    def count_by(self, instances, *field_names):
+        """Return a Counter of the instances that match the query by the
+        values of field_names, which are tuples if there is more than one
+        field name.
+        """
+        projection = self._projection(field_names)
+        if len(projection) == 1:
+            return Counter(value for value, in self._compile(projection)(instances))
+        else:
+            return Counter(self._compile(projection)(instances))
@@ -0,0 +1,58 @@
+"""Views of fixed-width binary records of namedspace classes.
+
+A namedspace class generated with struct_formats packs its instances
+into fixed-width binary records. Its _iter_unpack class method yields a
+NamedspaceRecordView for each record in a buffer, such as a str,
+bytearray or memoryview, without copying the buffer.
+
+>>> from namedspace import namedspace
+>>> Tick = namedspace("Tick", ("symbol", "price", "size"), struct_formats={"symbol": "4s", "price": "d", "size": "i"})
+>>> feed = bytearray(Tick(symbol="ABCD", price=10.5, size=100)._pack() + Tick("WXYZ", 20.25, 300)._pack())
+>>> ticks = list(Tick._iter_unpack(feed))
+>>> ticks
+[Tick(symbol='ABCD', price=10.5, size=100), Tick(symbol='WXYZ', price=20.25, size=300)]
+
+Each field is decoded from the buffer only when it is read.
+
+>>> ticks[1].price
+20.25
+>>> ticks[1]["symbol"]
+'WXYZ'
+"""
+from namedspace.view import NamedspaceView
+
+
+class NamedspaceRecordView(NamedspaceView):
+    """View of one fixed-width binary record of a namedspace class.
+
+    Field values are decoded from the buffer each time they are read.
+    Setting a mutable field encodes the new value into the buffer, which
+    must then be writable. Fields of a record cannot be deleted.
+    """
+    __slots__ = ("_namedspace_class", "_buffer", "_offset")
+
+    def __init__(self, namedspace_class, buffer, offset=0):
+        object.__setattr__(self, "_namedspace_class", namedspace_class)
+        object.__setattr__(self, "_buffer", buffer)
+        object.__setattr__(self, "_offset", offset)
+
+    def _read_field(self, index):
+        return self._namedspace_class._field_structs[index].unpack_from(self._buffer,
+                self._offset + self._namedspace_class._field_offsets[index])[0]
+
+    def _write_field(self, index, field_value):
+        self._namedspace_class._field_structs[index].pack_into(self._buffer,
+                self._offset + self._namedspace_class._field_offsets[index], field_value)
+
+    def _del_value(self, field_name):
+        self._validate_field_mutability(field_name)
+        raise TypeError("Fields of binary {typename} records cannot be deleted.".format(
+                typename=self._namedspace_class.__name__))
+
+    @property
+    def _field_values(self):
+        return self._namedspace_class._struct.unpack_from(self._buffer, self._offset)
+
+    @property
+    def _field_values_iter(self):
+        return iter(self._field_values)
@@ -0,0 +1,302 @@
+"""Columnar storage for collections of instances of one namedspace class.
+
+A NamedspaceTable stores each field of a namedspace class as a column.
+Numeric columns are stored as NumPy arrays when NumPy is available, and
+as array.array objects otherwise. All other columns are stored as lists.
+
+>>> from namedspace import namedspace
+>>> Trade = namedspace("Trade", ("symbol", "quantity", "price"))
+>>> trades = NamedspaceTable(Trade, [
+...     Trade(symbol="ABC", quantity=100, price=10.5),
+...     Trade(symbol="XYZ", quantity=200, price=20.25),
+...     Trade(symbol="ABC", quantity=300, price=11.0),
+...     ])
+>>> len(trades)
+3
+
+Rows are lightweight views that provide the same attribute and mapping
+access as the namedspace instances they were built from.
+
+>>> trades[1]
+Trade(symbol='XYZ', quantity=200, price=20.25)
+>>> trades[1].quantity
+200
+>>> trades[1]["symbol"]
+'XYZ'
+
+Whole columns can be filtered and aggregated without building a Python
+object per row.
+
+>>> abc_trades = trades.select([symbol == "ABC" for symbol in trades.column("symbol")])
+>>> len(abc_trades)
+2
+>>> abc_trades.sum("quantity")
+400
+>>> trades.max("price")
+20.25
+"""
+from array import array
+from itertools import compress
+from itertools import izip
+
+from frozendict import frozendict
+
+from namedspace import NamedspaceMeta
+from namedspace.view import NamedspaceView
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _column_typecode(values):
+    """Return the array typecode that can hold all of values and give them
+    back with the same types, or None. Ints and floats mixed in one
+    column would all be read back as floats, so they get None.
+    """
+    typecode = None
+    for value in values:
+        value_type = type(value)
+        if value_type is float:
+            value_typecode = "d"
+        elif value_type in (int, long):
+            value_typecode = "l"
+        else:
+            return None
+
+        if typecode is None:
+            typecode = value_typecode
+        elif typecode != value_typecode:
+            return None
+    return typecode
+
+
+# The kind of value that each array.array typecode holds, using the
+# NumPy dtype kind letters
+_typecode_kinds = dict(b="i", B="u", h="i", H="u", i="i", I="u", l="i", L="u", f="f", d="f")
+
+
+def _column_accepts(column, value):
+    "Return True if value can be stored in column and read back with the same type."
+    if isinstance(column, list):
+        return True
+    elif numpy is not None and isinstance(column, numpy.ndarray):
+        kind = column.dtype.kind
+    else:
+        kind = _typecode_kinds.get(column.typecode)
+
+    if kind == "f":
+        return type(value) is float
+    elif kind in ("i", "u"):
+        return type(value) in (int, long)
+    else:
+        return False
+
+
+def _make_column(values, typecode):
+    "Return a column holding values, stored according to typecode."
+    if typecode is None:
+        return values
+    elif numpy is not None:
+        return numpy.fromiter(values, dtype=numpy.dtype(typecode), count=len(values))
+    else:
+        return array(typecode, values)
+
+
+def _infer_column(values):
+    "Return a numeric column holding values if they are all numbers, or else values."
+    typecode = _column_typecode(values)
+    try:
+        return _make_column(values, typecode)
+    except OverflowError:
+        return values
+
+
+def _select_column(column, mask):
+    "Return a new column holding the items of column for which mask is true."
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        return column[numpy.asarray(mask, dtype=bool)]
+    elif isinstance(column, array):
+        return array(column.typecode, compress(column, mask))
+    else:
+        return list(compress(column, mask))
+
+
+class NamedspaceTable(object):
+    """Column-oriented collection of instances of one namedspace class.
+
+    The column_types mapping can give an array.array typecode for any
+    field. Fields without a typecode are stored as numeric columns if
+    all of their values are ints or all of them are floats, and as lists
+    otherwise.
+
+    The values stored for each instance are the same as its
+    _field_values, so values provided by subclass properties are
+    stored too. A table has a fixed number of rows once it is built.
+    Writing a value that a numeric column cannot hold as it is, such as
+    a float in an integer column or None, turns that column into a
+    list.
+    """
+
+    def __init__(self, namedspace_class, instances=(), column_types=frozendict()):
+        if not isinstance(namedspace_class, NamedspaceMeta):
+            raise ValueError("Value for argument 'namedspace_class' must be a namedspace class.")
+
+        field_names = namedspace_class._field_names
+        for field_name in column_types:
+            if not field_name in field_names:
+                raise ValueError("Value for argument 'column_types' contains invalid field '{field_name}'.".format(
+                        field_name=field_name))
+
+        value_lists = tuple([] for _ in field_names)
+        for instance in instances:
+            if not isinstance(instance, namedspace_class):
+                raise ValueError("Instances must be {typename} instances.".format(
+                        typename=namedspace_class.__name__))
+            for values, value in izip(value_lists, instance._field_values_iter):
+                values.append(value)
+
+        columns = []
+        for field_name, values in izip(field_names, value_lists):
+            if field_name in column_types:
+                columns.append(_make_column(values, column_types[field_name]))
+            else:
+                columns.append(_infer_column(values))
+
+        self._init_columns(namedspace_class, columns)
+
+    def _init_columns(self, namedspace_class, columns):
+        self._namedspace_class = namedspace_class
+        self._columns = tuple(columns)
+        self._column_indexes = namedspace_class._field_indexes
+        self._length = len(columns[0])
+
+    def _write_value(self, column_index, row_index, value):
+        "Store value in a row of a column, turning the column into a list if it cannot hold value."
+        column = self._columns[column_index]
+        if _column_accepts(column, value):
+            try:
+                column[row_index] = value
+                return
+            except OverflowError:
+                pass
+
+        column = column.tolist()
+        column[row_index] = value
+        self._columns = self._columns[:column_index] + (column,) + self._columns[column_index + 1:]
+
+    @classmethod
+    def _from_columns(cls, namedspace_class, columns):
+        table = cls.__new__(cls)
+        table._init_columns(namedspace_class, columns)
+        return table
+
+    @property
+    def namedspace_class(self):
+        return self._namedspace_class
+
+    def __repr__(self):
+        return "{clsname}({typename}, {length} rows)".format(clsname=self.__class__.__name__,
+                typename=self._namedspace_class.__name__, length=self._length)
+
+    #
+    # Row access
+    #
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index in xrange(self._length):
+            yield NamedspaceTableRow(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._from_columns(self._namedspace_class, [column[index] for column in self._columns])
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("{clsname} index out of range".format(clsname=self.__class__.__name__))
+        return NamedspaceTableRow(self, index)
+
+    def instances(self):
+        "Return a list of new namedspace instances built from the rows."
+        return self._namedspace_class._make_many(izip(*self._columns))
+
+    #
+    # Column access
+    #
+    def column(self, field_name):
+        "Return the column that stores the values of field_name."
+        try:
+            return self._columns[self._column_indexes[field_name]]
+        except KeyError:
+            raise self._namedspace_class.FieldNameError(
+                    "Field '{field_name}' does not exist in {typename} namedspace.".format(
+                    field_name=field_name, typename=self._namedspace_class.__name__))
+
+    def select(self, mask):
+        """Return a new table with the rows for which mask is true.
+
+        The mask is a sequence of booleans with one item per row. With
+        NumPy available, it is typically the result of a vectorized
+        comparison on a column.
+        """
+        if numpy is None or not isinstance(mask, numpy.ndarray):
+            mask = list(mask)
+        if len(mask) != self._length:
+            raise ValueError("Mask has {mask_length} items, but the table has {length} rows.".format(
+                    mask_length=len(mask), length=self._length))
+        return self._from_columns(self._namedspace_class, [_select_column(column, mask)
+                for column in self._columns])
+
+    def sum(self, field_name):
+        "Return the sum of the values of field_name."
+        column = self.column(field_name)
+        return column.sum() if hasattr(column, "sum") else sum(column)
+
+    def min(self, field_name):
+        "Return the smallest value of field_name."
+        column = self.column(field_name)
+        return column.min() if hasattr(column, "min") else min(column)
+
+    def max(self, field_name):
+        "Return the largest value of field_name."
+        column = self.column(field_name)
+        return column.max() if hasattr(column, "max") else max(column)
+
+    def mean(self, field_name):
+        "Return the arithmetic mean of the values of field_name."
+        column = self.column(field_name)
+        return column.mean() if hasattr(column, "mean") else float(sum(column)) / len(column)
+
+
+class NamedspaceTableRow(NamedspaceView):
+    """View of one row of a NamedspaceTable.
+
+    A row provides the same attribute and mapping access as an instance
+    of the namedspace class of its table. Setting or deleting a mutable
+    field writes through to the table.
+    """
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table, index):
+        object.__setattr__(self, "_table", table)
+        object.__setattr__(self, "_index", index)
+
+    @property
+    def _namedspace_class(self):
+        return self._table._namedspace_class
+
+    def _read_field(self, index):
+        return self._table._columns[index][self._index]
+
+    def _write_field(self, index, field_value):
+        self._table._write_value(index, self._index, field_value)
+
+    @property
+    def _field_values_iter(self):
+        index = self._index
+        for column in self._table._columns:
+            yield column[index]
@@ -0,0 +1,163 @@
+"""Base class for objects that present field values held elsewhere as a
+namedspace instance.
+"""
+from collections import Hashable
+from collections import MutableMapping
+from collections import OrderedDict
+from itertools import izip
+
+
+class NamedspaceView(object):
+    """Base class for views that behave like namedspace instances.
+
+    A view provides the same attribute and mapping access as an
+    instance of its namedspace class, but reads and writes the field
+    values through the _read_field and _write_field methods, which
+    subclasses implement in terms of field positions. Subclasses also
+    provide the _namedspace_class attribute.
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return '{clsname}({items})'.format(clsname=self._namedspace_class.__name__,
+            items=", ".join("{name}={value!r}".format(name=name, value=value)
+                for name, value in self._field_items))
+
+    #
+    # Generic value access methods
+    #
+    def _field_index(self, field_name):
+        namedspace_class = self._namedspace_class
+        try:
+            return namedspace_class._field_indexes[field_name]
+        except KeyError:
+            raise namedspace_class.FieldNameError("Field '{field_name}' does not exist in the {typename}"
+                    " namedspace.".format(field_name=field_name, typename=namedspace_class.__name__))
+
+    def _get_value(self, field_name):
+        field_value = self._read_field(self._field_index(field_name))
+        if field_value is None and not self._namedspace_class._return_none:
+            raise self.FieldNameError("Field '{field_name}' does not yet exist in this {typename}"
+                    " namedspace instance.".format(field_name=field_name, typename=self._namedspace_class.__name__))
+        return field_value
+
+    def _validate_field_mutability(self, field_name):
+        namedspace_class = self._namedspace_class
+        if not field_name in namedspace_class._all_fields_set:
+            raise namedspace_class.FieldNameError("Field '{field_name}' does not exist in {typename}"
+                    " namedspace.".format(field_name=field_name, typename=namedspace_class.__name__))
+        if not field_name in namedspace_class._mutable_fields_set:
+            if namedspace_class._mutable_fields_set:
+                raise namedspace_class.ReadOnlyFieldError("Field '{field_name}' of {typename} namedspace is"
+                        " read-only.".format(field_name=field_name, typename=namedspace_class.__name__))
+            else:
+                raise namedspace_class.ReadOnlyNamedspaceError("{typename} namedspace is read-only.".format(
+                        typename=namedspace_class.__name__))
+
+    def _set_value(self, field_name, field_value):
+        self._validate_field_mutability(field_name)
+        self._write_field(self._field_index(field_name), field_value)
+
+    def _del_value(self, field_name):
+        self._set_value(field_name, None)
+
+    @property
+    def FieldNameError(self):
+        return self._namedspace_class.FieldNameError
+
+    #
+    # Namedspace API
+    #
+    @property
+    def _field_names(self):
+        return self._namedspace_class._field_names
+
+    @property
+    def _field_names_iter(self):
+        return self._namedspace_class._field_names_iter
+
+    @property
+    def _field_values_iter(self):
+        for index in xrange(len(self._field_names)):
+            yield self._read_field(index)
+
+    @property
+    def _field_values(self):
+        return tuple(self._field_values_iter)
+
+    @property
+    def _field_items_iter(self):
+        return izip(self._field_names, self._field_values_iter)
+
+    @property
+    def _field_items(self):
+        return list(self._field_items_iter)
+
+    @property
+    def _as_dict(self):
+        'Return a the namedspace values as a new ordered dictionary.'
+        return OrderedDict(self._field_items_iter)
+
+    #
+    # Attribute API
+    #
+    def __getattr__(self, attr_name):
+        try:
+            return self._get_value(attr_name)
+        except self.FieldNameError as e:
+            raise AttributeError(str(e))
+
+    def __setattr__(self, attr_name, attr_value):
+        return self._set_value(attr_name, attr_value)
+
+    def __delattr__(self, attr_name):
+        return self._del_value(attr_name)
+
+    #
+    # Hashable API
+    #
+    def __hash__(self):
+        if self._namedspace_class._mutable_fields_set:
+            raise self._namedspace_class.MutableNamedspaceError(
+                    "Mutable {typename} namedspace instance is not hashable.".format(
+                    typename=self._namedspace_class.__name__))
+        else:
+            return hash(self._field_values)
+
+    def __eq__(self, obj):
+        "Views are equal to views and instances of the same namedspace class with the same field values."
+        if isinstance(obj, NamedspaceView):
+            return obj._namedspace_class is self._namedspace_class and obj._field_values == self._field_values
+        else:
+            return isinstance(obj, self._namedspace_class) and obj._field_values == self._field_values
+
+    def __ne__(self, obj):
+        return not self == obj
+
+    #
+    # MutableMapping API
+    #
+    def __contains__(self, name):
+        return name in self._field_names
+
+    def __iter__(self):
+        return self._field_names_iter
+
+    def __len__(self):
+        return len(self._field_names)
+
+    def __getitem__(self, item_name):
+        try:
+            return self._get_value(item_name)
+        except self.FieldNameError as e:
+            raise KeyError(str(e))
+
+    def __setitem__(self, item_name, item_value):
+        return self._set_value(item_name, item_value)
+
+    def __delitem__(self, item_name):
+        return self._del_value(item_name)
+
+
+Hashable.register(NamedspaceView)
+MutableMapping.register(NamedspaceView)
@@ -3,7 +3,7 @@ import os
 
 from setuptools import setup, find_packages
 
-__version__ = "1.2.1"
+__version__ = "1.3.0"
 
 def file_read(filename):
     filepath = os.path.join(os.path.dirname(__file__), filename)
@@ -13,8 +13,9 @@ def file_read(filename):
 setup(
     name = "namedspace",
     version = __version__,
-    packages = find_packages(),
+    packages = find_packages(exclude=("benchmarks",)),
     install_requires = ["frozendict"],
+    extras_require = {"numpy": ["numpy"]},
     author = "Warren A. Smith",
     author_email = "warren@wandrsmith.net",
     description = "Namespace class factory.",
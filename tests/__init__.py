@@ -3,7 +3,15 @@ __author__ = 'warren'
 import doctest
 
 import namedspace
+import namedspace.index
+import namedspace.query
+import namedspace.record
+import namedspace.table
 
 def load_tests(loader, tests, ignore):
     tests.addTests(doctest.DocTestSuite(namedspace))
+    tests.addTests(doctest.DocTestSuite(namedspace.index))
+    tests.addTests(doctest.DocTestSuite(namedspace.query))
+    tests.addTests(doctest.DocTestSuite(namedspace.record))
+    tests.addTests(doctest.DocTestSuite(namedspace.table))
     return tests
@@ -0,0 +1,130 @@
+from unittest import TestCase
+
+from namedspace import NamedspaceIndex
+from namedspace import namedspace
+
+
+class NamedspaceIndexTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.TestNamedspace = namedspace("TestIndexNamedspace", ("id", "group"), optional_fields="score",
+            mutable_fields=("group", "score"))
+        cls.SlotsNamedspace = namedspace("TestIndexSlotsNamedspace", ("id", "group"), optional_fields="score",
+            mutable_fields="score", storage="slots")
+
+    def setUp(self):
+        self.test_instances = [self.TestNamedspace(id=index, group=index % 3, score=index * 10)
+                for index in xrange(10)]
+
+    def test_hash_index(self):
+        """
+        A hash index should find all of the instances with a key.
+        """
+        index = NamedspaceIndex(self.TestNamedspace, "group", self.test_instances)
+        self.assertEqual(len(index), 10)
+        self.assertEqual([test_ns.id for test_ns in index.lookup(1)], [1, 4, 7])
+        self.assertEqual(index.lookup(5), [])
+        self.assertEqual(len(index[0]), 4)
+        self.assertRaises(KeyError, index.__getitem__, 5)
+        self.assertRaises(TypeError, index.range, 0, 1)
+
+    def test_unique_index(self):
+        """
+        A unique index should hold one instance per key and reject
+        duplicates.
+        """
+        index = NamedspaceIndex(self.TestNamedspace, ("group", "id"), self.test_instances, unique=True)
+        self.assertIs(index[(1, 4)], self.test_instances[4])
+        self.assertRaises(ValueError, index.add, self.TestNamedspace(id=4, group=1))
+        self.assertRaises(ValueError, NamedspaceIndex, self.TestNamedspace, "group", self.test_instances,
+                unique=True)
+
+    def test_sorted_index(self):
+        """
+        A sorted index should find the instances with keys in a range,
+        in key order.
+        """
+        index = NamedspaceIndex(self.TestNamedspace, "score", reversed(self.test_instances), sorted=True)
+        self.assertEqual([test_ns.id for test_ns in index], range(10))
+        self.assertEqual([test_ns.id for test_ns in index.range(20, 50)], [2, 3, 4, 5])
+        self.assertEqual([test_ns.id for test_ns in index.range(20, 50, include_low=False, include_high=False)],
+                [3, 4])
+        self.assertEqual([test_ns.id for test_ns in index.range(high=10)], [0, 1])
+        self.assertEqual([test_ns.id for test_ns in index.range(low=80)], [8, 9])
+        self.assertEqual(index.lookup(30), [self.test_instances[3]])
+
+    def test_discard(self):
+        """
+        Discarded instances should no longer be found, even when equal
+        instances are.
+        """
+        index = NamedspaceIndex(self.TestNamedspace, "group", self.test_instances, sorted=True)
+        equal_ns = self.TestNamedspace(id=1, group=1, score=10)
+        index.add(equal_ns)
+        index.discard(self.test_instances[1])
+        index.discard(self.test_instances[1])
+        self.assertNotIn(self.test_instances[1], index)
+        self.assertIn(equal_ns, index)
+        self.assertEqual(len(index.lookup(1)), 3)
+
+    def test_mutation(self):
+        """
+        Indexes should follow changes of indexed fields through
+        attribute and mapping access.
+        """
+        hash_index = NamedspaceIndex(self.TestNamedspace, "group", self.test_instances)
+        sorted_index = NamedspaceIndex(self.TestNamedspace, "score", self.test_instances, sorted=True)
+        test_ns = self.test_instances[1]
+
+        test_ns.group = 2
+        self.assertNotIn(test_ns, hash_index.lookup(1))
+        self.assertIn(test_ns, hash_index.lookup(2))
+
+        test_ns["score"] = 1000
+        self.assertIs(sorted_index.range(low=500)[0], test_ns)
+
+        del test_ns.score
+        self.assertIs(sorted_index.range(high=None)[0], test_ns)
+        self.assertEqual(sorted_index.lookup(None), [test_ns])
+
+        unindexed_ns = self.TestNamedspace(id=99, group=0)
+        unindexed_ns.group = 1
+        self.assertNotIn(unindexed_ns, hash_index)
+
+    def test_unique_mutation(self):
+        """
+        A change that would duplicate a key in a unique index should be
+        undone.
+        """
+        sorted_index = NamedspaceIndex(self.TestNamedspace, "score", self.test_instances, sorted=True)
+        unique_index = NamedspaceIndex(self.TestNamedspace, "score", self.test_instances, unique=True)
+        test_ns = self.test_instances[1]
+
+        self.assertRaises(ValueError, setattr, test_ns, "score", 20)
+        self.assertEqual(test_ns.score, 10)
+        self.assertIs(unique_index[10], test_ns)
+        self.assertEqual(sorted_index.lookup(10), [test_ns])
+        self.assertEqual(sorted_index.lookup(20), [self.test_instances[2]])
+
+    def test_slots_subclass(self):
+        """
+        Indexes over subclasses of slots storage classes should follow
+        changes too.
+        """
+        class SubNamedspace(self.SlotsNamedspace):
+            __slots__ = ()
+
+        test_instances = [SubNamedspace(id=index, group="group", score=index) for index in xrange(3)]
+        index = NamedspaceIndex(SubNamedspace, "score", test_instances, sorted=True)
+        test_instances[0].score = 5
+        self.assertEqual(index.range(low=1), [test_instances[1], test_instances[2], test_instances[0]])
+
+    def test_invalid_arguments(self):
+        """
+        Invalid arguments should raise a ValueError.
+        """
+        self.assertRaises(ValueError, NamedspaceIndex, dict, "id")
+        self.assertRaises(ValueError, NamedspaceIndex, self.TestNamedspace, "other")
+        self.assertRaises(ValueError, NamedspaceIndex, self.TestNamedspace, ())
+        self.assertRaises(ValueError, NamedspaceIndex, self.TestNamedspace, "id", [self.SlotsNamedspace(1, 2)])
@@ -0,0 +1,95 @@
+from unittest import TestCase
+
+from namedspace import NamedspaceQuery
+from namedspace import NamedspaceTable
+from namedspace import namedspace
+
+
+class NamedspaceQueryTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.TestNamedspace = namedspace("TestQueryNamedspace", ("id", "group"), optional_fields=("score", "note"),
+            default_values={"note": "no note"})
+        cls.SlotsNamedspace = namedspace("TestQuerySlotsNamedspace", ("id", "group"),
+            optional_fields=("score", "note"), default_values={"note": "no note"}, storage="slots")
+
+    def make_instances(self, namedspace_class):
+        return [namedspace_class(id=index, group=index % 3, score=index * 10 if index % 4 else None)
+                for index in xrange(12)]
+
+    def test_operators(self):
+        """
+        Each operator should match the same instances as the equivalent
+        comparison of attribute values, for both kinds of storage.
+        """
+        for namedspace_class in (self.TestNamedspace, self.SlotsNamedspace):
+            instances = self.make_instances(namedspace_class)
+
+            def ids(**conditions):
+                return [instance.id for instance in namedspace_class._where(**conditions)(instances)]
+
+            self.assertEqual(ids(group=1), [1, 4, 7, 10])
+            self.assertEqual(ids(group__eq=1, id__gt=4), [7, 10])
+            self.assertEqual(ids(group__ne=0, id__lt=3), [1, 2])
+            self.assertEqual(ids(id__le=1, id__ge=1), [1])
+            self.assertEqual(ids(id__in=[2, 3, 99]), [2, 3])
+            self.assertEqual(ids(score__isnone=True), [0, 4, 8])
+            self.assertEqual(ids(score__isnone=False, id__lt=4), [1, 2, 3])
+            self.assertEqual(ids(note__contains="no", id__lt=2), [0, 1])
+            self.assertEqual([instance.id for instance in namedspace_class._where(score__contains=1)(
+                    [namedspace_class(id=20, group=0), namedspace_class(id=21, group=0, score=[1])])], [21])
+            self.assertEqual(ids(note="no note", id=5), [5])
+
+    def test_lazy(self):
+        """
+        A query should consume its instances only as its results are
+        consumed.
+        """
+        instances = iter(self.make_instances(self.TestNamedspace))
+        results = self.TestNamedspace._where(group=0)(instances)
+        self.assertEqual(next(results).id, 0)
+        self.assertEqual(next(instances).id, 1)
+
+    def test_values_and_count_by(self):
+        """
+        values() should yield tuples of field values of the matching
+        instances, and count_by() should count them by field values.
+        """
+        instances = self.make_instances(self.TestNamedspace)
+        query = self.TestNamedspace._where(id__lt=5)
+        self.assertEqual(list(query.values(instances, "id", "score")),
+                [(0, None), (1, 10), (2, 20), (3, 30), (4, None)])
+        self.assertEqual(list(query.values(instances, "note"))[0], ("no note",))
+        self.assertEqual(query.count_by(instances, "group"), {0: 2, 1: 2, 2: 1})
+        self.assertEqual(query.count_by(instances, "group", "note")[(1, "no note")], 2)
+        self.assertRaises(self.TestNamedspace.FieldNameError, query.values, instances, "other")
+        self.assertRaises(ValueError, query.values, instances)
+        self.assertRaises(ValueError, query.count_by, instances)
+
+    def test_subclass_and_views(self):
+        """
+        Instances of subclasses and table rows should be read through
+        attribute access.
+        """
+        class SubNamedspace(self.TestNamedspace):
+            @property
+            def score(self):
+                return -1
+
+        instances = self.make_instances(self.TestNamedspace)
+        sub_instances = self.make_instances(SubNamedspace)
+        self.assertEqual(len(list(self.TestNamedspace._where(score=-1)(instances + sub_instances))), 12)
+        self.assertEqual(len(list(SubNamedspace._where(score=-1)(sub_instances))), 12)
+
+        table = NamedspaceTable(self.TestNamedspace, instances)
+        self.assertEqual([row.id for row in self.TestNamedspace._where(group=2)(table)], [2, 5, 8, 11])
+
+    def test_invalid_conditions(self):
+        """
+        Conditions on fields that do not exist should be rejected when
+        the query is built.
+        """
+        self.assertRaises(self.TestNamedspace.FieldNameError, self.TestNamedspace._where, other=1)
+        self.assertRaises(self.TestNamedspace.FieldNameError, self.TestNamedspace._where, id__like=1)
+        self.assertRaises(ValueError, NamedspaceQuery, dict, {})
@@ -0,0 +1,82 @@
+import struct
+from unittest import TestCase
+
+from namedspace import NamedspaceRecordView
+from namedspace import namedspace
+
+
+class NamedspaceRecordTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.TestNamedspace = namedspace("TestRecordNamedspace", ("id", "code"), optional_fields="price",
+            mutable_fields="price", default_values={"price": 0.0},
+            struct_formats={"id": "q", "code": "3s", "price": "d"}, struct_byte_order=">")
+        cls.test_ns1 = cls.TestNamedspace(id=1, code="ABC", price=1.5)
+        cls.test_ns2 = cls.TestNamedspace(id=2, code="XYZ")
+
+    def test_pack(self):
+        """
+        _pack() should encode the field values with the declared
+        formats and byte order, without padding.
+        """
+        self.assertEqual(self.TestNamedspace._struct.format, ">q3sd")
+        self.assertEqual(self.test_ns1._pack(), struct.pack(">q3sd", 1, "ABC", 1.5))
+        self.assertEqual(self.test_ns2._pack(), struct.pack(">q3sd", 2, "XYZ", 0.0))
+
+        buffer = bytearray(self.TestNamedspace._struct.size * 2)
+        self.test_ns1._pack_into(buffer, self.TestNamedspace._struct.size)
+        self.assertEqual(buffer[self.TestNamedspace._struct.size:], self.test_ns1._pack())
+
+    def test_unpack_from(self):
+        """
+        _unpack_from() should build an equal instance from a record at
+        any offset in a buffer.
+        """
+        buffer = memoryview(self.test_ns1._pack() + self.test_ns2._pack())
+        self.assertEqual(self.TestNamedspace._unpack_from(buffer), self.test_ns1)
+        self.assertEqual(self.TestNamedspace._unpack_from(buffer, self.TestNamedspace._struct.size), self.test_ns2)
+
+    def test_iter_unpack(self):
+        """
+        _iter_unpack() should yield a view of each record that behaves
+        like the instance it was packed from.
+        """
+        buffer = bytearray(self.test_ns1._pack() + self.test_ns2._pack())
+        record1, record2 = self.TestNamedspace._iter_unpack(memoryview(buffer))
+
+        self.assertIsInstance(record1, NamedspaceRecordView)
+        self.assertEqual(record1.id, 1)
+        self.assertEqual(record2["code"], "XYZ")
+        self.assertEqual(record1._as_dict, self.test_ns1._as_dict)
+        self.assertEqual(record2._field_values, self.test_ns2._field_values)
+        self.assertEqual(repr(record2), repr(self.test_ns2))
+        self.assertRaises(AttributeError, lambda: record1.other)
+
+        self.assertRaises(ValueError, list, self.TestNamedspace._iter_unpack(buffer[1:]))
+
+    def test_record_mutation(self):
+        """
+        Setting a mutable field of a record view should encode the
+        value into the buffer, and other fields should be read-only.
+        """
+        buffer = bytearray(self.test_ns1._pack())
+        record, = self.TestNamedspace._iter_unpack(buffer)
+
+        record.price = 3.0
+        self.assertEqual(self.TestNamedspace._unpack_from(buffer).price, 3.0)
+        self.assertRaises(self.TestNamedspace.ReadOnlyFieldError, setattr, record, "id", 5)
+        self.assertRaises(TypeError, delattr, record, "price")
+
+    def test_invalid_formats(self):
+        """
+        Struct formats should be given for every field, and each should
+        be a valid format for a single value.
+        """
+        self.assertRaises(ValueError, namedspace, "BadRecordNamedspace", ("id", "code"),
+            struct_formats={"id": "q"})
+        self.assertRaises(ValueError, namedspace, "BadRecordNamedspace", "id", struct_formats={"id": "2q"})
+        self.assertRaises(ValueError, namedspace, "BadRecordNamedspace", "id", struct_formats={"id": "Z"})
+        self.assertRaises(ValueError, namedspace, "BadRecordNamedspace", "id", struct_formats={"id": "q"},
+            struct_byte_order="@")
+        self.assertFalse(hasattr(namedspace("PlainNamedspace", "id"), "_pack"))
@@ -0,0 +1,147 @@
+from array import array
+from unittest import TestCase
+
+from namedspace import NamedspaceTable
+from namedspace import namedspace
+from namedspace.table import numpy
+
+
+class NamedspaceTableTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.TestNamedspace = namedspace("TestTableNamedspace", ("id", "name"),
+            optional_fields=("price", "note"), mutable_fields="note")
+        cls.mock_instances = [
+            cls.TestNamedspace(id=1, name="one", price=1.5),
+            cls.TestNamedspace(id=2, name="two", price=2.5),
+            cls.TestNamedspace(id=3, name="three", price=3.5, note="note"),
+            ]
+
+    def setUp(self):
+        self.test_table = NamedspaceTable(self.TestNamedspace, self.mock_instances)
+
+    def test_columns(self):
+        """
+        Numeric fields should be stored in numeric columns, and all
+        other fields in lists.
+        """
+        numeric_column_type = array if numpy is None else numpy.ndarray
+        self.assertIsInstance(self.test_table.column("id"), numeric_column_type)
+        self.assertIsInstance(self.test_table.column("price"), numeric_column_type)
+        self.assertEqual(list(self.test_table.column("price")), [1.5, 2.5, 3.5])
+        self.assertEqual(self.test_table.column("name"), ["one", "two", "three"])
+        self.assertEqual(self.test_table.column("note"), [None, None, "note"])
+        self.assertRaises(self.TestNamedspace.FieldNameError, self.test_table.column, "other")
+
+        mixed_table = NamedspaceTable(self.TestNamedspace, [self.TestNamedspace(id=1, name="one", price=1.5),
+                self.TestNamedspace(id=2, name="two", price=2)])
+        self.assertEqual(mixed_table.column("price"), [1.5, 2])
+        self.assertIs(type(mixed_table[1].price), int)
+        self.assertEqual(mixed_table.instances()[1], self.TestNamedspace(id=2, name="two", price=2))
+        self.assertIs(type(mixed_table.instances()[1].price), int)
+
+    def test_column_types(self):
+        """
+        Explicit column types should be used when they are given.
+        """
+        test_table = NamedspaceTable(self.TestNamedspace, self.mock_instances, column_types={"id": "d"})
+        self.assertEqual(self.test_table.sum("id"), 6)
+        self.assertIsInstance(test_table.column("id")[0], float)
+        self.assertRaises(ValueError, NamedspaceTable, self.TestNamedspace, column_types={"other": "d"})
+
+    def test_rows(self):
+        """
+        Rows should provide the same values and API as the instances
+        they were built from.
+        """
+        self.assertEqual(len(self.test_table), 3)
+        for row, test_ns in zip(self.test_table, self.mock_instances):
+            self.assertEqual(row._field_values, test_ns._field_values)
+            self.assertEqual(row._as_dict, test_ns._as_dict)
+            self.assertEqual(repr(row), repr(test_ns))
+            self.assertEqual(row.name, test_ns.name)
+            self.assertEqual(row["id"], test_ns["id"])
+            self.assertEqual(list(row), list(test_ns))
+
+        row = self.test_table[-1]
+        self.assertEqual(row.note, "note")
+        self.assertRaises(AttributeError, lambda: self.test_table[0].note)
+        self.assertRaises(KeyError, lambda: self.test_table[0]["other"])
+        self.assertRaises(IndexError, lambda: self.test_table[3])
+
+    def test_row_mutation(self):
+        """
+        Setting a mutable field of a row should write to the table, and
+        other fields should be read-only.
+        """
+        row = self.test_table[0]
+        row.note = "new note"
+        self.assertEqual(self.test_table.column("note")[0], "new note")
+        del row["note"]
+        self.assertIs(self.test_table.column("note")[0], None)
+
+        self.assertRaises(self.TestNamedspace.ReadOnlyFieldError, setattr, row, "name", "new name")
+        self.assertRaises(self.TestNamedspace.FieldNameError, setattr, row, "other", "value")
+
+    def test_numeric_column_mutation(self):
+        """
+        Writing a value that a numeric column cannot hold should turn the
+        column into a list, and other values should stay in the column.
+        """
+        cls = namedspace("TestNumericTableNamedspace", ("id", "quantity"), optional_fields="price",
+            mutable_fields=("quantity", "price"))
+        test_table = NamedspaceTable(cls, [cls(id=1, quantity=10, price=1.5), cls(id=2, quantity=20, price=2.5)])
+        numeric_column_type = array if numpy is None else numpy.ndarray
+
+        test_table[0].quantity = 15
+        test_table[1].price = 3.0
+        self.assertIsInstance(test_table.column("quantity"), numeric_column_type)
+        self.assertIsInstance(test_table.column("price"), numeric_column_type)
+
+        test_table[0].quantity = 15.5
+        self.assertEqual(test_table.column("quantity"), [15.5, 20])
+        self.assertIs(type(test_table[1].quantity), int)
+
+        del test_table[1].price
+        self.assertEqual(test_table.column("price"), [1.5, None])
+        self.assertRaises(AttributeError, lambda: test_table[1].price)
+        self.assertEqual(test_table.sum("quantity"), 35.5)
+
+    def test_row_equality(self):
+        """
+        Rows should be equal to the instances they were built from, in
+        both directions.
+        """
+        for row, test_ns in zip(self.test_table, self.mock_instances):
+            self.assertTrue(row == test_ns)
+            self.assertTrue(test_ns == row)
+            self.assertFalse(row != test_ns)
+            self.assertFalse(test_ns != row)
+        self.assertNotEqual(self.test_table[0], self.mock_instances[1])
+        self.assertNotEqual(self.mock_instances[1], self.test_table[0])
+
+    def test_select(self):
+        """
+        select() should return a table with the rows for which the
+        mask is true.
+        """
+        test_table = self.test_table.select([price > 1.5 for price in self.test_table.column("price")])
+        self.assertEqual([row.id for row in test_table], [2, 3])
+        self.assertEqual(self.test_table[1:].column("name"), ["two", "three"])
+        self.assertRaises(ValueError, self.test_table.select, [True])
+
+    def test_aggregates(self):
+        """
+        Aggregates should be computed over whole columns.
+        """
+        self.assertEqual(self.test_table.sum("price"), 7.5)
+        self.assertEqual(self.test_table.min("price"), 1.5)
+        self.assertEqual(self.test_table.max("id"), 3)
+        self.assertEqual(self.test_table.mean("id"), 2.0)
+
+    def test_instances(self):
+        """
+        instances() should rebuild equal namedspace instances.
+        """
+        self.assertEqual(self.test_table.instances(), self.mock_instances)
@@ -1,6 +1,28 @@
 
+import cPickle
+import pickle
+from copy import copy
+from copy import deepcopy
+from os import getpid
+from os import listdir
+from os import path
+from shutil import rmtree
+from sys import getcheckinterval
+from sys import getsizeof
+from sys import setcheckinterval
+from tempfile import mkdtemp
+from StringIO import StringIO
+from threading import Lock
+from threading import Thread
+from time import sleep
 from unittest import TestCase
+from weakref import WeakSet
 
+import namedspace as namedspace_package
+from namedspace import NamedspaceCacheInfo
+from namedspace import NamedspaceClassCache
+from namedspace import NamedspaceCodeCache
+from namedspace import NamedspaceCodeCacheInfo
 from namedspace import namedspace
 
 class NamedspaceTests(TestCase):
@@ -84,6 +106,57 @@ class NamedspaceTests(TestCase):
         ns2_hash = hash(self.test_ns2)
         self.assertIsInstance(ns2_hash, int)
 
+    def test_cached_hash(self):
+        """
+        The hash of an immutable namedspace should be computed once
+        and cached, unless caching is disabled for the class.
+        """
+        test_ns = self.TestNamedspace2(id=self.mock_id)
+        self.assertEqual(hash(test_ns), hash(test_ns._field_values))
+        self.assertEqual(test_ns._hash_value, hash(test_ns._field_values))
+
+        class UncachedNamedspace(self.TestNamedspace2):
+            _cache_hash = False
+
+        test_ns = UncachedNamedspace(id=self.mock_id)
+        self.assertEqual(hash(test_ns), hash(test_ns._field_values))
+        self.assertRaises(AttributeError, lambda: test_ns._hash_value)
+
+        TestSlotsNamedspace = namedspace("TestSlotsNamedspace", "id", storage="slots")
+        test_ns = TestSlotsNamedspace(id=self.mock_id)
+        self.assertEqual(hash(test_ns), hash((self.mock_id,)))
+        self.assertEqual(test_ns._hash_value, hash((self.mock_id,)))
+
+    def test_equality(self):
+        """
+        Instances of the same class with the same field values should
+        be equal, and otherwise not equal.
+        """
+        test_ns = self.TestNamedspace2(id=self.mock_id)
+        self.assertTrue(test_ns == self.test_ns2)
+        self.assertFalse(test_ns != self.test_ns2)
+        self.assertTrue(test_ns == self.TestNamedspace2(id=self.mock_id, name=None))
+        self.assertTrue(test_ns != self.TestNamedspace2(id="other_id"))
+        self.assertTrue(test_ns != self.TestNamedspace3(id=self.mock_id))
+        self.assertTrue(test_ns != (self.mock_id,))
+
+    def test_ordering(self):
+        """
+        Namedspaces generated with order=True should compare their
+        field values in field order.
+        """
+        TestNamedspace = namedspace("TestOrderedNamedspace", ("id", "name"), order=True)
+        test_ns1 = TestNamedspace(id=1, name="b")
+        test_ns2 = TestNamedspace(id=2, name="a")
+        test_ns3 = TestNamedspace(id=2, name="b")
+
+        self.assertEqual(sorted([test_ns3, test_ns1, test_ns2]), [test_ns1, test_ns2, test_ns3])
+        self.assertTrue(test_ns1 < test_ns2 <= test_ns3)
+        self.assertTrue(test_ns3 > test_ns2 >= test_ns1)
+        self.assertTrue(test_ns3 <= TestNamedspace(id=2, name="b") <= test_ns3)
+        self.assertFalse(test_ns3 < TestNamedspace(id=2, name="b"))
+        self.assertNotIn("__lt__", self.TestNamedspace2.__dict__)
+
     def test_default_values(self):
         """
         Default values for fields should be retrieved (if they exist)
@@ -103,6 +176,36 @@ class NamedspaceTests(TestCase):
         self.assertEqual(self.test_ns1.name, self.mock_name_template.format(
             id=self.test_ns1.id))
 
+    def test_lazy_default_value_factories(self):
+        """
+        With lazy_factories, a default value factory should only be
+        called when its field is first read, and its value should then
+        be kept in the instance.
+        """
+        factory_calls = []
+
+        def name_factory(ns):
+            factory_calls.append(ns.id)
+            return "" if ns.id == "no name" else self.mock_name_template.format(id=ns.id)
+
+        TestNamedspace = namedspace("TestLazyNamedspace", ("id", "name"), optional_fields="extra",
+            default_value_factories={"name": name_factory, "extra": lambda ns: None}, lazy_factories=True)
+
+        for test_ns in (TestNamedspace(id=self.mock_id), TestNamedspace._make_many([(self.mock_id,)])[0]):
+            del factory_calls[:]
+            self.assertEqual(factory_calls, [])
+            self.assertEqual(test_ns.name, self.mock_name_template.format(id=self.mock_id))
+            self.assertEqual(test_ns.name, self.mock_name_template.format(id=self.mock_id))
+            self.assertEqual(factory_calls, [self.mock_id])
+
+        self.assertRaises(ValueError, TestNamedspace, name="name")
+        self.assertRaises(ValueError, TestNamedspace, id=self.mock_id, name="")
+        self.assertRaises(ValueError, TestNamedspace._make_many, [(self.mock_id, "")])
+        self.assertRaises(ValueError, TestNamedspace._make_many, [{"id": self.mock_id, "name": ""}])
+
+        test_ns = TestNamedspace(id="no name")
+        self.assertRaises(ValueError, lambda: test_ns.name)
+
     def test_field_names(self):
         """
         The _field_names property should return the correct values.
@@ -156,6 +259,200 @@ class NamedspaceTests(TestCase):
         """
         self.assertIs(None, self.test_ns3.name)
 
+    def test_make_many(self):
+        """
+        _make_many() should build the same instances as the class
+        constructor from tuples and mappings.
+        """
+        test_ns1, test_ns2 = self.TestNamedspace1._make_many([
+            (self.mock_id, None, "description"),
+            {"id": self.mock_id, "extra": "extra"},
+            ])
+        self.assertEqual(test_ns1, self.TestNamedspace1(id=self.mock_id, description="description"))
+        self.assertEqual(test_ns2, self.TestNamedspace1(id=self.mock_id, extra="extra"))
+        self.assertEqual(test_ns2.name, self.mock_name_template.format(id=self.mock_id))
+        self.assertIs(test_ns2.extra, "extra")
+
+        self.assertRaises(ValueError, self.TestNamedspace1._make_many, [()])
+        self.assertRaises(ValueError, self.TestNamedspace1._make_many, [{"id": ""}])
+        self.assertRaises(ValueError, self.TestNamedspace1._make_many, [{"id": self.mock_id, "other": 1}])
+        self.assertRaises(ValueError, self.TestNamedspace1._make_many, [(1, 2, 3, 4, 5)])
+
+    def test_make_concurrent(self):
+        """
+        _make_concurrent() should build the rows in order, with up to
+        the given number of factories waiting at the same time.
+        """
+        lock = Lock()
+        active = [0, 0]
+
+        def lookup_name(ns):
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return "name for {id}".format(id=ns.id)
+
+        cls = namedspace("ConcurrentNamedspace", "id", optional_fields="name",
+            default_value_factories={"name": lookup_name})
+        instances = cls._make_concurrent(((index,) for index in xrange(12)), concurrency=4)
+        self.assertEqual([instance.name for instance in instances],
+                ["name for {id}".format(id=index) for index in xrange(12)])
+        self.assertTrue(1 < active[1] <= 4)
+
+        self.assertRaises(ValueError, cls._make_concurrent, [(1,), ()])
+        self.assertRaises(ValueError, cls._make_concurrent, [(1,)], concurrency=0)
+        self.assertRaises(ValueError, cls._make_concurrent, [(1,)], chunksize=0)
+
+        active[1] = 0
+        instances = cls._make_concurrent(((index,) for index in xrange(12)), concurrency=2, chunksize=5)
+        self.assertEqual([instance.id for instance in instances], range(12))
+        self.assertEqual(active[1], 2)
+        self.assertEqual(cls._make_concurrent([]), [])
+
+    def test_make_parallel(self):
+        """
+        _make_parallel() should build the rows in worker processes and
+        return equal instances in order, for classes that cannot be
+        imported too.
+        """
+        cls = namedspace("ParallelNamedspace", "id", optional_fields=("name", "pid"),
+            default_value_factories={"name": lambda ns: "name for {id}".format(id=ns.id), "pid": lambda ns: getpid()})
+        rows = [(index,) for index in xrange(10)]
+        instances = cls._make_parallel(iter(rows), workers=2, chunksize=3)
+        self.assertEqual([instance._replace(pid=None) for instance in instances],
+                [instance._replace(pid=None) for instance in cls._make_many(rows)])
+        self.assertNotIn(getpid(), [instance.pid for instance in instances])
+
+        self.assertEqual(PickleNamedspace._make_parallel([{"id": 1}], workers=1)[0].name, "name for 1")
+        self.assertRaises(ValueError, cls._make_parallel, [(1,), ()], workers=1)
+        self.assertRaises(ValueError, cls._make_parallel, rows, chunksize=0)
+
+        class LocalSubNamedspace(cls):
+            pass
+
+        self.assertRaises(ValueError, LocalSubNamedspace._make_parallel, rows)
+
+    def test_sizeof(self):
+        """
+        _sizeof() should count the instance and its storage, and the
+        field values only when deep, and _sizeof_many() should count
+        shared values and repeated instances once.
+        """
+        for storage in ("dict", "slots"):
+            cls = namedspace("SizeofNamedspace", ("a", "b"), storage=storage)
+            shared_value = "shared value" * 100
+            instance = cls(a=shared_value, b="b value")
+            other_instance = cls(a=shared_value, b="other b value")
+
+            self.assertGreaterEqual(instance._sizeof(), getsizeof(instance))
+            self.assertEqual(instance._sizeof(), cls(a=1, b=2)._sizeof())
+            self.assertEqual(instance._sizeof(deep=True),
+                    instance._sizeof() + getsizeof(shared_value) + getsizeof("b value"))
+
+            self.assertEqual(cls._sizeof_many([instance, other_instance, instance], deep=True),
+                    instance._sizeof(deep=True) + other_instance._sizeof(deep=True) - getsizeof(shared_value))
+            self.assertEqual(cls._sizeof_many([]), 0)
+
+    def test_positional_values(self):
+        """
+        Positional values should be assigned to fields in field name
+        order, by the constructor and by _make().
+        """
+        test_ns = self.TestNamedspace1(self.mock_id, None, "description")
+        self.assertEqual(test_ns, self.TestNamedspace1(id=self.mock_id, description="description"))
+        self.assertEqual(test_ns, self.TestNamedspace1._make(iter((self.mock_id, None, "description"))))
+        self.assertEqual(self.TestNamedspace1(self.mock_id, extra="extra").extra, "extra")
+
+        self.assertRaises(ValueError, self.TestNamedspace1, self.mock_id, id=self.mock_id)
+        self.assertRaises(ValueError, self.TestNamedspace1, 1, 2, 3, 4, 5)
+        self.assertRaises(ValueError, self.TestNamedspace1._make, ())
+
+    def test_replace(self):
+        """
+        _replace() should return a new instance with the given values
+        replaced, and leave the original unchanged.
+        """
+        test_ns = self.test_ns2._replace(name="new name")
+        self.assertEqual(test_ns.name, "new name")
+        self.assertIs(test_ns.id, self.mock_id)
+        self.assertEqual(self.test_ns2.name, self.mock_name_template.format(id=self.mock_id))
+        self.assertRaises(ValueError, self.test_ns2._replace, other="value")
+        self.assertRaises(ValueError, self.test_ns2._replace, id=None)
+
+        test_ns = self.test_ns1._replace(extra=None, description="description")
+        self.assertEqual(test_ns.extra, self.mock_default_value)
+        test_ns.description = "new description"
+        self.assertEqual(self.test_ns1._read_storage("description"), None)
+
+    def test_copy(self):
+        """
+        Copies of immutable instances should be the instance itself,
+        and deep copies too when all of the values are immutable.
+        """
+        self.assertIs(copy(self.test_ns2), self.test_ns2)
+        self.assertIs(deepcopy(self.test_ns2), self.test_ns2)
+
+        test_ns = self.TestNamedspace2(id=[self.mock_id])
+        self.assertIs(copy(test_ns), test_ns)
+        test_ns_copy = deepcopy(test_ns)
+        self.assertIsNot(test_ns_copy, test_ns)
+        self.assertEqual(test_ns_copy, test_ns)
+        self.assertIsNot(test_ns_copy.id, test_ns.id)
+
+        test_ns = self.TestNamedspace1(id=self.mock_id, description="description")
+        for test_ns_copy in (copy(test_ns), deepcopy(test_ns)):
+            self.assertIsNot(test_ns_copy, test_ns)
+            self.assertEqual(test_ns_copy, test_ns)
+            test_ns_copy.description = "new description"
+            self.assertEqual(test_ns.description, "description")
+
+    def test_generated_init(self):
+        """
+        The generated __init__ should apply defaults in field order,
+        leave explicit None values in storage, and check required
+        fields, for any field names.
+        """
+        for storage in ("dict", "slots"):
+            cls = namedspace("InitNamedspace", ("id", "code"), optional_fields=("name", "label", "note"),
+                default_values={"label": "label"}, storage=storage,
+                default_value_factories={"name": lambda ns: "name for {id}".format(id=ns.id), "code": lambda ns: ""})
+            test_ns = cls(id=1, code="code", label=None)
+            self.assertEqual(test_ns._field_values, (1, "code", "name for 1", "label", None))
+            self.assertIsNone(test_ns._read_storage("label"))
+            self.assertEqual(test_ns._read_storage("name"), "name for 1")
+            self.assertRaises(ValueError, cls, id=1)
+            self.assertRaises(ValueError, cls, id="", code="code")
+            self.assertRaises(ValueError, cls, id=1, code="code", other="other")
+
+        cls = namedspace("NonIdentifierInitNamedspace", ("first-name", "last name"),
+            default_values={"last name": "last"})
+        self.assertEqual(cls(**{"first-name": "first"})._field_values, ("first", "last"))
+        self.assertRaises(ValueError, cls)
+
+    def test_field_index(self):
+        """
+        _field_index() should return the position of a field.
+        """
+        self.assertEqual(self.TestNamedspace1._field_index("id"), 0)
+        self.assertEqual(self.TestNamedspace1._field_index("extra"), 3)
+        self.assertRaises(self.TestNamedspace1.FieldNameError, self.TestNamedspace1._field_index, "other")
+
+    def test_field_properties(self):
+        """
+        Each field should be read through its own property on the
+        namedspace class, with the same semantics as _get_value.
+        """
+        for field_name in self.TestNamedspace1._field_names:
+            self.assertIsInstance(self.TestNamedspace1.__dict__[field_name], property)
+
+        self.assertIs(self.test_ns1.id, self.test_ns1._get_value("id"))
+        self.assertEqual(self.test_ns1.name, self.mock_name_template.format(id=self.mock_id))
+        self.assertIs(self.test_ns1.extra, self.mock_default_value)
+        self.assertRaises(AttributeError, lambda: self.test_ns1.description)
+
 
 class SubNamedspace(namedspace("_SubNamedspace", ("id", "name"))):
     _name_tmpl = "Overridden name for {id}"
@@ -188,6 +485,54 @@ class SubNamedspaceTests(TestCase):
         self.assertIn(SubNamedspace._name_tmpl.format(id=self.mock_id),
             self.test_ns1._field_values)
 
+    def test_slots_overridden_property(self):
+        """
+        Constructing a slots storage subclass should store field values
+        behind properties that override them, from keyword arguments and
+        from defaults.
+        """
+        class SlotsSubNamedspace(namedspace("_SlotsSubNamedspace", "id", optional_fields=("name", "sku"),
+                default_values={"sku": "default sku"}, storage="slots")):
+            __slots__ = ()
+
+            @property
+            def sku(self):
+                return "sku for {id}".format(id=self.id)
+
+        for test_ns in (SlotsSubNamedspace(id=self.mock_id), SlotsSubNamedspace(id=self.mock_id, sku="sku"),
+                SlotsSubNamedspace(self.mock_id, "name", "sku")):
+            self.assertEqual(test_ns.sku, "sku for {id}".format(id=self.mock_id))
+        self.assertEqual(SlotsSubNamedspace(id=self.mock_id)._read_storage("sku"), "default sku")
+        self.assertEqual(SlotsSubNamedspace(id=self.mock_id, sku="sku")._read_storage("sku"), "sku")
+
+    def test_subclass_make_many(self):
+        """
+        _make_many() should use the subclass constructor when the
+        subclass overrides it.
+        """
+        class InitSubNamedspace(SubNamedspace):
+            def __init__(self, **kwargs):
+                kwargs["name"] = "init name"
+                super(InitSubNamedspace, self).__init__(**kwargs)
+
+        test_ns, = InitSubNamedspace._make_many([(self.mock_id,)])
+        self.assertIsInstance(test_ns, InitSubNamedspace)
+        self.assertEqual(test_ns._read_storage("name"), "init name")
+
+    def test_subclass_replace(self):
+        """
+        _replace() should use the subclass constructor when the
+        subclass overrides it.
+        """
+        class InitSubNamedspace(SubNamedspace):
+            def __init__(self, **kwargs):
+                kwargs["name"] = "init name"
+                super(InitSubNamedspace, self).__init__(**kwargs)
+
+        test_ns = InitSubNamedspace(id=self.mock_id)._replace(id="new id")
+        self.assertEqual(test_ns._read_storage("id"), "new id")
+        self.assertEqual(test_ns._read_storage("name"), "init name")
+
     def test_subclass_repr(self):
         """
         Subclass __repr__() result should contain the subclass name, not
@@ -196,3 +541,661 @@ class SubNamedspaceTests(TestCase):
         repr_result = repr(self.test_ns1)
         self.assertNotIn("_SubNamedspace", repr_result)
         self.assertIn("SubNamedspace", repr_result)
+
+
+PickleNamedspace = namedspace("PickleNamedspace", "id", optional_fields=("name", "extra"),
+    mutable_fields="extra", default_value_factories={"name": lambda ns: "name for {id}".format(id=ns.id)})
+PickleSlotsNamedspace = namedspace("PickleSlotsNamedspace", "id", optional_fields=("name", "extra"),
+    storage="slots")
+
+
+class PickleNamedspaceTests(TestCase):
+
+    def test_round_trip(self):
+        """
+        Instances should pickle and unpickle with every protocol and
+        pickle implementation.
+        """
+        for test_ns in (PickleNamedspace(id=1, extra="extra"), PickleSlotsNamedspace(id=1, name="name"),
+                SubNamedspace(id=1, name="name")):
+            for pickle_module in (pickle, cPickle):
+                for protocol in xrange(pickle.HIGHEST_PROTOCOL + 1):
+                    unpickled_ns = pickle_module.loads(pickle_module.dumps(test_ns, protocol))
+                    self.assertIs(type(unpickled_ns), type(test_ns))
+                    self.assertEqual(unpickled_ns, test_ns)
+                    self.assertEqual(unpickled_ns._as_dict, test_ns._as_dict)
+
+    def test_compact_state(self):
+        """
+        The pickled state should be a tuple of the stored values in
+        field name order, restored without re-running the constructor.
+        """
+        test_ns = PickleNamedspace(id=1)
+        self.assertEqual(test_ns.__getstate__(), (1, "name for 1", None))
+        self.assertNotIn("_field_value_storage", pickle.dumps(test_ns, 0))
+
+        unpickled_ns = PickleNamedspace.__new__(PickleNamedspace)
+        unpickled_ns.__setstate__((None, None, "extra"))
+        self.assertEqual(unpickled_ns.extra, "extra")
+        self.assertRaises(AttributeError, lambda: unpickled_ns.id)
+
+        unpickled_ns = pickle.loads(pickle.dumps(test_ns, pickle.HIGHEST_PROTOCOL))
+        unpickled_ns.extra = "extra"
+        self.assertEqual(unpickled_ns.extra, "extra")
+
+    def test_old_pickles(self):
+        """
+        Pickles written by releases before 1.3.0, whose state is the
+        instance __dict__, should still load.
+        """
+        old_pickles = (
+            "ccopy_reg\n_reconstructor\np0\n(ctests.test_namedspace_whitebox\nPickleNamedspace\np1\nc__builtin__\n"
+            "object\np2\nNtp3\nRp4\n(dp5\nS'_field_value_storage'\np6\nccollections\nOrderedDict\np7\n((lp8\n"
+            "(lp9\nS'name'\np10\naS'x'\np11\naa(lp12\nS'id'\np13\naI1\naa(lp14\nS'extra'\np15\naNaatp16\nRp17\nsb.",
+            "\x80\x02ctests.test_namedspace_whitebox\nPickleNamedspace\nq\x00)\x81q\x01}q\x02U\x14_field_value_storageq"
+            "\x03ccollections\nOrderedDict\nq\x04]q\x05(]q\x06(U\x04nameq\x07U\x01xq\x08e]q\t(U\x02idq\nK\x01e]q\x0b"
+            "(U\x05extraq\x0cNee\x85q\rRq\x0esb.",
+            )
+        for old_pickle in old_pickles:
+            for pickle_module in (pickle, cPickle):
+                unpickled_ns = pickle_module.loads(old_pickle)
+                self.assertEqual(unpickled_ns, PickleNamedspace(id=1, name="x"))
+                self.assertEqual(unpickled_ns.__getstate__(), (1, "x", None))
+
+
+class StreamingNamedspaceTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.TestNamedspace = namedspace("TestStreamingNamedspace", ("id", "name"), optional_fields="note",
+            default_values={"note": "default note"})
+        cls.test_instances = [
+            cls.TestNamedspace(id="1", name="one"),
+            cls.TestNamedspace(id="2", name="two", note="note"),
+            ]
+
+    def test_csv_round_trip(self):
+        """
+        Instances written by _write_csv() should be read back by
+        _iter_csv().
+        """
+        csv_file = StringIO()
+        self.TestNamedspace._write_csv(csv_file, self.test_instances)
+        self.assertEqual(csv_file.getvalue().splitlines()[0], "id,name,note")
+
+        csv_file.seek(0)
+        self.assertEqual(list(self.TestNamedspace._iter_csv(csv_file)), self.test_instances)
+
+    def test_csv_columns(self):
+        """
+        _iter_csv() should map columns to fields by the header row, and
+        read empty values as missing values.
+        """
+        csv_file = StringIO("name,id\none,1\ntwo,\n")
+        test_instances = self.TestNamedspace._iter_csv(csv_file)
+        self.assertEqual(next(test_instances), self.test_instances[0])
+        self.assertRaises(ValueError, next, test_instances)
+
+        csv_file = StringIO("id,name,note\n1,one,\n")
+        self.assertEqual(list(self.TestNamedspace._iter_csv(csv_file)), self.test_instances[:1])
+
+        self.assertEqual(list(self.TestNamedspace._iter_csv(StringIO(""))), [])
+        self.assertRaises(ValueError, list, self.TestNamedspace._iter_csv(StringIO("id,other\n")))
+        self.assertRaises(ValueError, list, self.TestNamedspace._iter_csv(StringIO("id,id\n1,2\n")))
+
+    def test_csv_short_rows(self):
+        """
+        _iter_csv() should read the values missing from short rows as
+        missing values, whatever the order of the columns.
+        """
+        for csv_text in ("id,name,note\n1,one\n", "name,id,note\none,1\n"):
+            self.assertEqual(list(self.TestNamedspace._iter_csv(StringIO(csv_text))), self.test_instances[:1])
+        for csv_text in ("id,name,note\n1\n", "name,id,note\none\n"):
+            self.assertRaises(ValueError, list, self.TestNamedspace._iter_csv(StringIO(csv_text)))
+
+    def test_jsonl_round_trip(self):
+        """
+        Instances written by _write_jsonl() should be read back by
+        _iter_jsonl(), which also accepts arrays of values.
+        """
+        jsonl_file = StringIO()
+        self.TestNamedspace._write_jsonl(jsonl_file, self.test_instances)
+        self.assertEqual(jsonl_file.getvalue().splitlines()[0], '{"id": "1", "name": "one", "note": "default note"}')
+
+        jsonl_file = StringIO(jsonl_file.getvalue() + '\n["3", "three"]\n')
+        test_instances = list(self.TestNamedspace._iter_jsonl(jsonl_file))
+        self.assertEqual(test_instances[:2], self.test_instances)
+        self.assertEqual(test_instances[2], self.TestNamedspace(id="3", name="three"))
+
+
+class SlotsNamedspaceTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mock_default_value = "Mock default value"
+        cls.mock_name_template = "Mock name for {id}"
+        cls.mock_id = "mock_id"
+
+        cls.TestNamedspace = namedspace("TestSlotsNamedspace", "id",
+            optional_fields=("name", "description", "extra"),
+            mutable_fields=("description", "extra"),
+            default_values={"extra": cls.mock_default_value},
+            default_value_factories={"name": lambda ns: cls.mock_name_template.format(id=ns.id)},
+            storage="slots")
+
+    def test_no_instance_dict(self):
+        """
+        Instances of a namedspace class with slots storage should not
+        have a __dict__.
+        """
+        test_ns = self.TestNamedspace(id=self.mock_id)
+        self.assertFalse(hasattr(test_ns, "__dict__"))
+        self.assertEqual(self.TestNamedspace.__slots__, ("id", "name", "description", "extra"))
+
+    def test_values(self):
+        """
+        Required, default and factory values should be available
+        through attribute access, the Mapping API and _as_dict.
+        """
+        test_ns = self.TestNamedspace(id=self.mock_id)
+        self.assertIs(test_ns.id, self.mock_id)
+        self.assertIs(test_ns["extra"], self.mock_default_value)
+        self.assertEqual(test_ns._get_value("name"), self.mock_name_template.format(id=self.mock_id))
+        self.assertEqual(test_ns._as_dict, dict(
+            id=self.mock_id,
+            name=self.mock_name_template.format(id=self.mock_id),
+            description=None,
+            extra=self.mock_default_value,
+            ))
+
+    def test_mutable_fields(self):
+        """
+        Mutable fields should be modifiable, and revert to their
+        default when deleted.
+        """
+        test_ns = self.TestNamedspace(id=self.mock_id)
+        self.assertRaises(AttributeError, lambda: test_ns.description)
+
+        test_ns._set_value("description", "new value")
+        self.assertEqual(test_ns.description, "new value")
+        test_ns["extra"] = "new extra"
+        self.assertEqual(test_ns.extra, "new extra")
+
+        test_ns._del_value("description")
+        self.assertRaises(AttributeError, lambda: test_ns.description)
+        del test_ns["extra"]
+        self.assertIs(test_ns.extra, self.mock_default_value)
+
+    def test_immutable_fields(self):
+        """
+        Fields not designated as mutable should be read-only.
+        """
+        test_ns = self.TestNamedspace(id=self.mock_id)
+        self.assertRaises(self.TestNamedspace.ReadOnlyFieldError,
+                lambda: setattr(test_ns, "id", "new id"))
+        self.assertRaises(self.TestNamedspace.FieldNameError,
+                lambda: setattr(test_ns, "some_other_field", "value"))
+
+    def test_invalid_field_name(self):
+        """
+        Field names that cannot be slot names should be rejected.
+        """
+        self.assertRaises(ValueError, namedspace, "BadSlotsNamedspace", "not-valid", storage="slots")
+        self.assertRaises(ValueError, namedspace, "BadSlotsNamedspace", "__private", storage="slots")
+        self.assertRaises(ValueError, namedspace, "BadStorageNamedspace", "id", storage="unknown")
+
+
+class NamedspaceClassCacheTests(TestCase):
+
+    def setUp(self):
+        self.saved_class_cache = namedspace_package.namedspace_class_cache
+        self.class_cache = namedspace_package.namedspace_class_cache = NamedspaceClassCache(maxsize=2)
+
+    def tearDown(self):
+        namedspace_package.namedspace_class_cache = self.saved_class_cache
+
+    def test_identical_spec(self):
+        """
+        Identical namedspace() calls should return the same class.
+        """
+        cls = namedspace("CachedNamedspace", "id", optional_fields=("name",), default_values={"name": "name"})
+        self.assertIs(cls, namedspace("CachedNamedspace", ("id",), optional_fields=("name",),
+                default_values={"name": "name"}))
+        self.assertEqual(self.class_cache.info(), NamedspaceCacheInfo(hits=1, misses=1, maxsize=2, currsize=1))
+
+    def test_different_spec(self):
+        """
+        namedspace() calls that differ in any argument should return
+        different classes.
+        """
+        cls = namedspace("CachedNamedspace", "id")
+        self.assertIsNot(cls, namedspace("OtherCachedNamedspace", "id"))
+        self.assertIsNot(cls, namedspace("CachedNamedspace", "id", return_none=True))
+        self.assertIsNot(cls, namedspace("CachedNamedspace", "id", storage="slots"))
+        self.assertIsNot(cls, namedspace("CachedNamedspace", "id", default_values={"id": 1}))
+
+    def test_equal_values_of_different_types(self):
+        """
+        Default values that compare equal but differ in type should not
+        share a class.
+        """
+        int_cls = namedspace("CachedNamedspace", "id", optional_fields="flag", default_values={"flag": 1})
+        bool_cls = namedspace("CachedNamedspace", "id", optional_fields="flag", default_values={"flag": True})
+        self.assertIsNot(int_cls, bool_cls)
+        self.assertIs(bool_cls(id=1).flag, True)
+        self.assertIsNot(bool_cls, namedspace("CachedNamedspace", "id", optional_fields="flag",
+                default_values={"flag": 1.0}))
+
+    def test_unhashable_spec(self):
+        """
+        Specs that cannot be used as a cache key should bypass the
+        cache.
+        """
+        cls = namedspace("CachedNamedspace", "id", default_values={"id": []})
+        self.assertIsNot(cls, namedspace("CachedNamedspace", "id", default_values={"id": []}))
+        self.assertEqual(self.class_cache.info().currsize, 0)
+
+    def test_eviction(self):
+        """
+        The least recently used class should be evicted when the cache
+        is full.
+        """
+        cls1 = namedspace("CachedNamedspace1", "id")
+        cls2 = namedspace("CachedNamedspace2", "id")
+        self.assertIs(cls1, namedspace("CachedNamedspace1", "id"))
+        namedspace("CachedNamedspace3", "id")
+        self.assertIs(cls1, namedspace("CachedNamedspace1", "id"))
+        self.assertIsNot(cls2, namedspace("CachedNamedspace2", "id"))
+
+    def test_clear(self):
+        """
+        Clearing the cache should remove all classes and reset the
+        statistics.
+        """
+        cls = namedspace("CachedNamedspace", "id")
+        self.class_cache.clear()
+        self.assertEqual(self.class_cache.info(), NamedspaceCacheInfo(hits=0, misses=0, maxsize=2, currsize=0))
+        self.assertIsNot(cls, namedspace("CachedNamedspace", "id"))
+
+
+
+class NamedspaceCodeCacheTests(TestCase):
+
+    def setUp(self):
+        self.directory = mkdtemp()
+        self.saved_class_cache = namedspace_package.namedspace_class_cache
+        self.saved_code_cache = namedspace_package.namedspace_code_cache
+        namedspace_package.namedspace_class_cache = NamedspaceClassCache(maxsize=0)
+        self.code_cache = namedspace_package.namedspace_code_cache = NamedspaceCodeCache(self.directory)
+
+    def tearDown(self):
+        namedspace_package.namedspace_class_cache = self.saved_class_cache
+        namedspace_package.namedspace_code_cache = self.saved_code_cache
+        rmtree(self.directory)
+
+    def test_cached_code(self):
+        """
+        The code of a generated class should be written to the cache
+        directory and used by later classes with the same source, whatever
+        their default values are.
+        """
+        cls = namedspace("CodeCachedNamedspace", "id", optional_fields=("name",), default_values={"name": "name"})
+        self.assertEqual(self.code_cache.info(), NamedspaceCodeCacheInfo(hits=0, misses=1, directory=self.directory))
+        self.assertEqual(len([file_name for file_name in listdir(self.directory) if file_name.endswith(".code")]), 1)
+
+        other_cls = namedspace("CodeCachedNamedspace", "id", optional_fields=("name",),
+                default_values={"name": "other name"})
+        self.assertEqual(self.code_cache.info(), NamedspaceCodeCacheInfo(hits=1, misses=1, directory=self.directory))
+        self.assertIsNot(cls, other_cls)
+        self.assertEqual(cls(id=1).name, "name")
+        self.assertEqual(other_cls(id=1).name, "other name")
+        self.assertIn("other name", other_cls.__doc__)
+
+        namedspace("CodeCachedNamedspace", "id", optional_fields=("name",), storage="slots")
+        self.assertEqual(self.code_cache.info().misses, 2)
+
+    def test_invalid_files(self):
+        """
+        Unreadable cache files and code cached by another version of the
+        library should not be used.
+        """
+        namedspace("CodeCachedNamedspace", "id")
+        for file_name in listdir(self.directory):
+            with open(path.join(self.directory, file_name), "wb") as code_file:
+                code_file.write("not marshalled code")
+        self.assertEqual(namedspace("CodeCachedNamedspace", "id")(id=1).id, 1)
+        self.assertEqual(self.code_cache.info().hits, 0)
+
+        saved_salts = namedspace_package._code_cache_salts[:]
+        namedspace_package._code_cache_salts[:] = ["another version"]
+        try:
+            namedspace("CodeCachedNamedspace", "id")
+        finally:
+            namedspace_package._code_cache_salts[:] = saved_salts
+        self.assertEqual(self.code_cache.info(), NamedspaceCodeCacheInfo(hits=0, misses=3, directory=self.directory))
+
+    def test_clear(self):
+        """
+        Clearing the cache should remove the code files and reset the
+        statistics.
+        """
+        namedspace("CodeCachedNamedspace", "id")
+        self.code_cache.clear()
+        self.assertEqual(listdir(self.directory), [])
+        self.assertEqual(self.code_cache.info(), NamedspaceCodeCacheInfo(hits=0, misses=0, directory=self.directory))
+
+InstrumentedNamedspace = namedspace("InstrumentedNamedspace", "id", optional_fields=("name", "extra"),
+        mutable_fields=("extra",), default_value_factories={"name": lambda self: "name"}, instrument=True)
+
+
+class InstrumentedNamedspaceTests(TestCase):
+
+    def setUp(self):
+        self.cls = InstrumentedNamedspace
+        self.immutable_cls = namedspace("InstrumentedImmutableNamedspace", "id", optional_fields=("name",),
+                return_none=True, storage="slots", instrument=True)
+        self.cls._counters.reset()
+        self.immutable_cls._counters.reset()
+
+    def test_registry(self):
+        """
+        Only instrumented classes should have counters and be listed in
+        the registry.
+        """
+        self.assertIn(self.cls, namedspace_package.instrumented_namedspace_classes)
+        self.assertIsNone(namedspace("UninstrumentedNamedspace", "id")._counters)
+        self.assertNotIn(namedspace("UninstrumentedNamedspace", "id"),
+                namedspace_package.instrumented_namedspace_classes)
+
+    def test_instances_and_factories(self):
+        """
+        Every way of creating an instance should be counted, along with
+        the default value factory calls.
+        """
+        instance = self.cls(id=1)
+        self.cls._make_many([(2,), {"id": 3}])
+        cPickle.loads(cPickle.dumps(instance, cPickle.HIGHEST_PROTOCOL))
+
+        counters = self.cls._counters
+        self.assertEqual(counters.instances_created, 4)
+        self.assertEqual(counters.factory_calls, {"name": 3})
+        self.assertGreater(counters.factory_seconds["name"], 0.0)
+
+    def test_misses_and_mutations(self):
+        """
+        Reading a field without a value should count as a miss, and
+        setting a field should count as a mutation.
+        """
+        instance = self.cls(id=1)
+        self.cls._counters.reset()
+        self.assertRaises(AttributeError, getattr, instance, "extra")
+        self.assertRaises(AttributeError, getattr, instance, "not_a_field")
+        instance.extra = "extra"
+        instance["extra"] = "more extra"
+
+        counters = self.cls._counters
+        self.assertEqual(counters.get_value_misses, 1)
+        self.assertEqual(counters.mutations, 2)
+
+    def test_return_none_and_hash(self):
+        """
+        Reads answered by return_none and hash computations should be
+        counted, but not cached hash lookups.
+        """
+        instance = self.immutable_cls(id=1)
+        hash(instance)
+        hash(instance)
+        self.assertEqual(self.immutable_cls._counters.hash_computations, 1)
+        self.assertEqual(self.immutable_cls._counters.as_dict()["hash_computations"], 1)
+
+        self.immutable_cls._counters.reset()
+        self.assertIsNone(instance.name)
+        self.assertEqual(self.immutable_cls._counters.return_none_fallbacks, 1)
+
+
+class InternedNamedspaceTests(TestCase):
+
+    def setUp(self):
+        self.cls = namedspace("InternedNamedspace", "id", optional_fields=("name",), intern=True)
+        self.defaults_cls = namedspace("InternedDefaultsNamedspace", "id", optional_fields=("name",),
+                default_values={"name": "name"}, storage="slots", intern=True)
+        self.cls._intern_pool.clear()
+        self.defaults_cls._intern_pool.clear()
+
+    def test_intern(self):
+        """
+        Instances with equal values should be the same object, however
+        they were built.
+        """
+        instance = self.cls(id=1, name="name")
+        self.assertIs(self.cls(1, "name"), instance)
+        self.assertIs(self.cls._make((1, "name")), instance)
+        self.assertIs(self.cls(id=1)._replace(name="name"), instance)
+        self.assertIsNot(self.cls(id=2, name="name"), instance)
+        self.assertIs(self.defaults_cls(id=1), self.defaults_cls(id=1, name="name"))
+
+    def test_equal_values_of_different_types(self):
+        """
+        Values that compare equal but differ in type should not share an
+        interned instance.
+        """
+        int_instance = self.cls(id=1)
+        self.assertIs(type(self.cls(id=1.0).id), float)
+        self.assertIs(type(self.cls(True).id), bool)
+        self.assertIs(type(self.cls._make_many([{"id": 1.0}])[0].id), float)
+        self.assertIs(self.cls(id=1), int_instance)
+
+        tuple_instance = self.cls(id=(1, (2,)))
+        self.assertEqual(repr(self.cls(id=(1.0, (2,))).id), "(1.0, (2,))")
+        self.assertEqual(repr(self.cls(id=(1, (2.0,))).id), "(1, (2.0,))")
+        self.assertIs(type(list(self.cls(id=frozenset([1.0])).id)[0]), float)
+        self.assertIs(self.cls(id=(1, (2,))), tuple_instance)
+
+    def test_info(self):
+        """
+        The pool should count hits and misses, and drop instances that
+        are no longer used.
+        """
+        instance = self.cls(id=1)
+        self.cls(id=1)
+        self.cls(id=2)
+        info = self.cls._intern_pool.info()
+        self.assertEqual((info.hits, info.misses, info.maxsize, info.currsize), (1, 2, None, 1))
+        self.assertAlmostEqual(info.hit_rate, 1.0 / 3)
+
+        del instance
+        self.assertEqual(self.cls._intern_pool.info().currsize, 0)
+
+    def test_maxsize(self):
+        """
+        A full pool should not intern new instances.
+        """
+        cls = namedspace("BoundedInternedNamedspace", "id", intern=True, intern_maxsize=1)
+        instance = cls(id=1)
+        self.assertIsNot(cls(id=2), cls(id=2))
+        self.assertIs(cls(id=1), instance)
+
+    def test_unhashable_values(self):
+        """
+        Instances with unhashable values should not be interned.
+        """
+        self.assertIsNot(self.cls(id=[1]), self.cls(id=[1]))
+
+    def test_subclass(self):
+        """
+        Instances of a subclass should not be interned together with
+        instances of its base class.
+        """
+        class SubInternedNamedspace(self.cls):
+            def __init__(self, *args, **kwargs):
+                super(SubInternedNamedspace, self).__init__(*args, **kwargs)
+
+        instance = self.cls(id=1)
+        sub_instance = SubInternedNamedspace(id=1)
+        self.assertIsNot(sub_instance, instance)
+        self.assertIs(SubInternedNamedspace(id=1), sub_instance)
+
+    def test_mutable(self):
+        """
+        Classes with mutable fields should not intern their instances.
+        """
+        self.assertRaises(ValueError, namedspace, "BadInternedNamedspace", "id", mutable_fields="id", intern=True)
+        self.assertRaises(ValueError, namedspace, "BadInternedNamedspace", "id", intern=True, intern_maxsize=-1)
+
+
+class ThreadSafeNamedspaceTests(TestCase):
+
+    def setUp(self):
+        self.classes = [namedspace("ThreadSafeNamedspace", ("low", "high"), optional_fields=("note",),
+                mutable_fields=("low", "high", "note"), storage=storage, thread_safe=True)
+                for storage in ("dict", "slots")]
+
+    def test_snapshot(self):
+        """
+        Each change should bump the version, and a snapshot should be a
+        read-only copy of the stored values at one version.
+        """
+        for cls in self.classes:
+            instance = cls(low=1, high=2)
+            snapshot = instance._snapshot()
+            self.assertEqual(instance._version, 0)
+
+            instance.note = "note"
+            instance._update(low=3, high=4)
+            del instance.note
+            self.assertEqual(instance._version, 6)
+            self.assertEqual((snapshot.low, snapshot["high"], snapshot.note, snapshot.version), (1, 2, None, 0))
+            self.assertEqual(dict(instance._snapshot()), dict(low=3, high=4, note=None))
+            self.assertRaises(TypeError, setattr, snapshot, "low", 5)
+            self.assertRaises(AttributeError, getattr, snapshot, "other")
+
+            self.assertRaises(cls.FieldNameError, instance._update, low=5, other=6)
+            self.assertEqual((instance.low, instance._version), (3, 6))
+
+    def test_snapshot_defaults(self):
+        """
+        A snapshot should give the field values the instance gives, with
+        defaults applied to deleted and None fields.
+        """
+        for storage in ("dict", "slots"):
+            cls = namedspace("ThreadSafeNamedspace", "a", optional_fields="b", mutable_fields="b",
+                    default_values={"b": 5}, storage=storage, thread_safe=True)
+            instance = cls(a=1, b=2)
+            del instance.b
+            self.assertEqual(instance._snapshot().b, 5)
+            self.assertEqual(dict(instance._snapshot()), instance._as_dict)
+            self.assertEqual(cls(a=1, b=None)._snapshot()["b"], 5)
+
+    def test_concurrent_changes(self):
+        """
+        Readers should never see a change half done while writers change
+        several fields at once.
+        """
+        saved_check_interval = getcheckinterval()
+        setcheckinterval(1)
+        try:
+            for cls in self.classes:
+                instance = cls(low=0, high=0)
+                inconsistent_reads = []
+                stop = []
+
+                def write():
+                    for value in xrange(2000):
+                        instance._update(low=value, high=value)
+                        instance._update(note=str(value))
+                        del instance.note
+
+                def read():
+                    while not stop:
+                        snapshot = instance._snapshot()
+                        low, high, _ = instance._field_values
+                        if snapshot.low != snapshot.high or low != high:
+                            inconsistent_reads.append((snapshot, low, high))
+
+                readers = [Thread(target=read) for _ in xrange(3)]
+                writers = [Thread(target=write) for _ in xrange(2)]
+                for thread in readers + writers:
+                    thread.start()
+                for thread in writers:
+                    thread.join()
+                stop.append(True)
+                for thread in readers:
+                    thread.join()
+
+                self.assertEqual(inconsistent_reads, [])
+                self.assertEqual(instance._version, 2 * 2000 * 3 * 2)
+        finally:
+            setcheckinterval(saved_check_interval)
+
+    def test_observer_reads_and_changes(self):
+        """
+        A field observer should be able to read and change the instance
+        during a change, and each instance should have its own lock.
+        """
+        for storage in ("dict", "slots"):
+            cls = namedspace("ObservedThreadSafeNamedspace", ("low", "high"), optional_fields=("note",),
+                    mutable_fields=("low", "high", "note"), storage=storage, thread_safe=True)
+            instance = cls(low=1, high=2)
+            seen = []
+
+            class Observer(object):
+
+                def _field_changing(self, instance, field_name):
+                    return field_name != "note"
+
+                def _field_changed(self, instance):
+                    seen.append((repr(instance), instance._snapshot().version, instance._as_dict["low"]))
+                    instance.note = "changed"
+
+            observer = Observer()
+            cls._field_observers = WeakSet([observer])
+            try:
+                thread = Thread(target=instance._update, kwargs=dict(low=3))
+                thread.daemon = True
+                thread.start()
+                thread.join(5)
+                self.assertFalse(thread.is_alive())
+            finally:
+                cls._field_observers = None
+
+            self.assertEqual(seen, [("ObservedThreadSafeNamedspace(low=3, high=2, note=None)", 1, 3)])
+            self.assertEqual((instance.note, instance._version), ("changed", 2))
+            self.assertIsNot(instance._get_write_lock(), cls(low=1, high=2)._get_write_lock())
+
+
+class DirtyFieldsNamedspaceTests(TestCase):
+
+    def test_dirty_fields(self):
+        """
+        Set and deleted fields should be dirty until the instance is
+        marked clean.
+        """
+        for storage in ("dict", "slots"):
+            for thread_safe in (False, True):
+                cls = namedspace("DirtyNamedspace", ("id", "name"), optional_fields=("note", "extra"),
+                        mutable_fields=("name", "note", "extra"), default_values={"note": "default note"},
+                        storage=storage, thread_safe=thread_safe, track_dirty_fields=True)
+                instance = cls(id=1, name="name", note="note")
+                self.assertEqual(instance._dirty_fields, ())
+
+                instance.extra = "extra"
+                instance["name"] = "new name"
+                del instance.note
+                self.assertEqual(instance._dirty_fields, ("name", "note", "extra"))
+                self.assertEqual(instance._dirty_items, [("name", "new name"), ("note", None), ("extra", "extra")])
+                self.assertEqual(instance.note, "default note")
+
+                instance._mark_clean()
+                self.assertEqual(instance._dirty_items, [])
+                instance.name = "newer name"
+                self.assertEqual(instance._dirty_fields, ("name",))
+
+                self.assertRaises(cls.ReadOnlyFieldError, setattr, instance, "id", 2)
+                self.assertEqual(instance._dirty_fields, ("name",))
+                self.assertEqual(copy(instance)._dirty_fields, ())
+
+    def test_immutable(self):
+        """
+        Classes without mutable fields should not track dirty fields.
+        """
+        self.assertRaises(ValueError, namedspace, "BadDirtyNamedspace", "id", track_dirty_fields=True)